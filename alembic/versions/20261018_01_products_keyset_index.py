@@ -0,0 +1,28 @@
+"""products keyset index
+
+Revision ID: 20261018_01
+Revises: 20260901_01
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "20261018_01"
+down_revision = "20260901_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_tenant_created",
+            "products",
+            ["tenant_id", "created_at", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_products_tenant_created", table_name="products", postgresql_concurrently=True)
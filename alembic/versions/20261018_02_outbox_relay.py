@@ -0,0 +1,47 @@
+"""outbox relay: retry columns, unpublished index and NOTIFY trigger
+
+Revision ID: 20261018_02
+Revises: 20261018_01
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_02"
+down_revision = "20261018_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox_events", sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.add_column("outbox_events", sa.Column("available_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")))
+    op.add_column("outbox_events", sa.Column("last_error", sa.Text()))
+    op.create_index("ix_outbox_unpublished", "outbox_events", ["created_at"], postgresql_where=sa.text("published_at IS NULL"))
+    op.execute(
+        """
+        CREATE FUNCTION notify_outbox_events() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox_events', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER outbox_events_notify
+        AFTER INSERT ON outbox_events
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_events()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS outbox_events_notify ON outbox_events")
+    op.execute("DROP FUNCTION IF EXISTS notify_outbox_events()")
+    op.drop_index("ix_outbox_unpublished", table_name="outbox_events")
+    op.drop_column("outbox_events", "last_error")
+    op.drop_column("outbox_events", "available_at")
+    op.drop_column("outbox_events", "attempts")
@@ -0,0 +1,26 @@
+"""refresh tokens stored as HMAC-SHA256 digests
+
+Revision ID: 20261018_03
+Revises: 20261018_02
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "20261018_03"
+down_revision = "20261018_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows hold argon2 hashes that can no longer be matched; their sessions must log in again.
+    op.execute("DELETE FROM refresh_tokens")
+    op.create_unique_constraint("uq_refresh_token_hash", "refresh_tokens", ["token_hash"])
+    op.create_index("ix_refresh_tokens_user_tenant", "refresh_tokens", ["user_id", "tenant_id"])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM refresh_tokens")
+    op.drop_index("ix_refresh_tokens_user_tenant", table_name="refresh_tokens")
+    op.drop_constraint("uq_refresh_token_hash", "refresh_tokens", type_="unique")
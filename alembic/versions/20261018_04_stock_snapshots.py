@@ -0,0 +1,57 @@
+"""stock snapshots for point-in-time balances
+
+Revision ID: 20261018_04
+Revises: 20261018_03
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "20261018_04"
+down_revision = "20261018_03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ADJUSTs recorded before this column existed replay as zero.
+    op.add_column("stock_movements", sa.Column("adjust_delta", sa.Numeric(14, 3)))
+    op.create_table(
+        "stock_snapshots",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("taken_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("warehouse_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("warehouses.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("qty", sa.Numeric(14, 3), nullable=False),
+        sa.UniqueConstraint("tenant_id", "taken_at", "product_id", "warehouse_id", name="uq_snapshot_tenant_taken_prod_wh"),
+    )
+    op.execute("ALTER TABLE stock_snapshots ENABLE ROW LEVEL SECURITY")
+    op.execute(
+        """
+        CREATE POLICY tenant_isolation_stock_snapshots
+        ON stock_snapshots
+        USING (
+            current_setting('app.is_superadmin', true) = 'on'
+            OR tenant_id = current_setting('app.tenant_id', true)::uuid
+        )
+        WITH CHECK (
+            current_setting('app.is_superadmin', true) = 'on'
+            OR tenant_id = current_setting('app.tenant_id', true)::uuid
+        )
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_movements_tenant_created", "stock_movements", ["tenant_id", "created_at"], postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_movements_tenant_created", table_name="stock_movements", postgresql_concurrently=True)
+    op.execute("DROP POLICY IF EXISTS tenant_isolation_stock_snapshots ON stock_snapshots")
+    op.drop_table("stock_snapshots")
+    op.drop_column("stock_movements", "adjust_delta")
@@ -0,0 +1,151 @@
+"""range-partition stock_movements by month
+
+The existing heap is attached as the first partition (MINVALUE up to the start
+of next month), so no rows are copied. Its primary key is rebuilt as (id, created_at)
+under an exclusive lock on that table: run it in a maintenance window.
+Idempotency uniqueness moves to movement_idempotency_keys because a unique
+constraint on a partitioned table must include the partition key.
+
+Revision ID: 20261018_05
+Revises: 20261018_04
+Create Date: 2026-10-18
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_05"
+down_revision = "20261018_04"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+FOREIGN_KEYS = [
+    "CONSTRAINT fk_stock_movements_tenant_id_tenants FOREIGN KEY (tenant_id) REFERENCES tenants(id) ON DELETE CASCADE",
+    "CONSTRAINT fk_stock_movements_product_id_products FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE",
+    "CONSTRAINT fk_stock_movements_from_warehouse_id_warehouses FOREIGN KEY (from_warehouse_id) REFERENCES warehouses(id) ON DELETE SET NULL",
+    "CONSTRAINT fk_stock_movements_to_warehouse_id_warehouses FOREIGN KEY (to_warehouse_id) REFERENCES warehouses(id) ON DELETE SET NULL",
+    "CONSTRAINT fk_stock_movements_created_by_users FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL",
+]
+
+COLUMNS = """
+    id uuid NOT NULL,
+    tenant_id uuid NOT NULL,
+    type movement_type NOT NULL,
+    qty numeric(14, 3) NOT NULL,
+    product_id uuid NOT NULL,
+    from_warehouse_id uuid,
+    to_warehouse_id uuid,
+    reference varchar(120),
+    idempotency_key varchar(120),
+    created_by uuid,
+    created_at timestamptz NOT NULL,
+    adjust_delta numeric(14, 3)
+"""
+
+POLICY = """
+    CREATE POLICY tenant_isolation_{table}
+    ON {table}
+    USING (
+        current_setting('app.is_superadmin', true) = 'on'
+        OR tenant_id = current_setting('app.tenant_id', true)::uuid
+    )
+    WITH CHECK (
+        current_setting('app.is_superadmin', true) = 'on'
+        OR tenant_id = current_setting('app.tenant_id', true)::uuid
+    )
+"""
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.month - 1 + months
+    return moment.replace(year=moment.year + index // 12, month=index % 12 + 1, day=1)
+
+
+def upgrade() -> None:
+    latest = op.get_bind().scalar(sa.text("SELECT max(created_at) FROM stock_movements"))
+    newest = max(filter(None, [latest, datetime.now(timezone.utc)])).astimezone(timezone.utc)
+    boundary = _add_months(newest.replace(day=1, hour=0, minute=0, second=0, microsecond=0), 1)
+
+    op.execute(
+        """
+        CREATE TABLE movement_idempotency_keys (
+            tenant_id uuid NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+            idempotency_key varchar(120) NOT NULL,
+            movement_id uuid NOT NULL,
+            created_at timestamptz NOT NULL,
+            CONSTRAINT pk_movement_idempotency_keys PRIMARY KEY (tenant_id, idempotency_key)
+        )
+        """
+    )
+    op.execute("ALTER TABLE movement_idempotency_keys ENABLE ROW LEVEL SECURITY")
+    op.execute(POLICY.format(table="movement_idempotency_keys"))
+    op.execute(
+        """
+        INSERT INTO movement_idempotency_keys (tenant_id, idempotency_key, movement_id, created_at)
+        SELECT tenant_id, idempotency_key, id, created_at FROM stock_movements WHERE idempotency_key IS NOT NULL
+        """
+    )
+
+    op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_legacy")
+    op.execute("ALTER TABLE stock_movements_legacy DROP CONSTRAINT uq_movement_tenant_idempotency")
+    op.execute("ALTER TABLE stock_movements_legacy DROP CONSTRAINT pk_stock_movements")
+    op.execute("ALTER TABLE stock_movements_legacy ADD CONSTRAINT pk_stock_movements_legacy PRIMARY KEY (id, created_at)")
+    op.execute("ALTER INDEX ix_movements_tenant_product_date RENAME TO ix_movements_legacy_tenant_product_date")
+    op.execute("ALTER INDEX ix_movements_tenant_created RENAME TO ix_movements_legacy_tenant_created")
+    op.execute("DROP POLICY tenant_isolation_stock_movements ON stock_movements_legacy")
+    op.execute("ALTER TABLE stock_movements_legacy DISABLE ROW LEVEL SECURITY")
+    # A validated CHECK matching the bound lets ATTACH skip its full-table scan.
+    op.execute(f"ALTER TABLE stock_movements_legacy ADD CONSTRAINT ck_stock_movements_legacy_range CHECK (created_at < '{boundary.isoformat()}') NOT VALID")
+    op.execute("ALTER TABLE stock_movements_legacy VALIDATE CONSTRAINT ck_stock_movements_legacy_range")
+
+    op.execute(
+        f"""
+        CREATE TABLE stock_movements (
+            {COLUMNS},
+            CONSTRAINT pk_stock_movements PRIMARY KEY (id, created_at),
+            {", ".join(FOREIGN_KEYS)}
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE INDEX ix_movements_tenant_product_date ON stock_movements (tenant_id, product_id, created_at)")
+    op.execute("CREATE INDEX ix_movements_tenant_created ON stock_movements (tenant_id, created_at)")
+    op.execute("ALTER TABLE stock_movements ENABLE ROW LEVEL SECURITY")
+    op.execute(POLICY.format(table="stock_movements"))
+
+    op.execute(f"ALTER TABLE stock_movements ATTACH PARTITION stock_movements_legacy FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')")
+    op.execute("ALTER TABLE stock_movements_legacy DROP CONSTRAINT ck_stock_movements_legacy_range")
+    for offset in range(MONTHS_AHEAD):
+        start, end = _add_months(boundary, offset), _add_months(boundary, offset + 1)
+        op.execute(
+            f"CREATE TABLE stock_movements_p{start:%Y%m} PARTITION OF stock_movements "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade() -> None:
+    op.execute(f"CREATE TABLE stock_movements_flat ({COLUMNS})")
+    op.execute(
+        """
+        INSERT INTO stock_movements_flat
+        SELECT id, tenant_id, type, qty, product_id, from_warehouse_id, to_warehouse_id,
+               reference, idempotency_key, created_by, created_at, adjust_delta
+        FROM stock_movements
+        """
+    )
+    op.execute("DROP TABLE stock_movements CASCADE")
+    op.execute("ALTER TABLE stock_movements_flat RENAME TO stock_movements")
+    constraints = [
+        "CONSTRAINT pk_stock_movements PRIMARY KEY (id)",
+        "CONSTRAINT uq_movement_tenant_idempotency UNIQUE (tenant_id, idempotency_key)",
+        *FOREIGN_KEYS,
+    ]
+    op.execute("ALTER TABLE stock_movements " + ", ".join(f"ADD {constraint}" for constraint in constraints))
+    op.execute("CREATE INDEX ix_movements_tenant_product_date ON stock_movements (tenant_id, product_id, created_at)")
+    op.execute("CREATE INDEX ix_movements_tenant_created ON stock_movements (tenant_id, created_at)")
+    op.execute("ALTER TABLE stock_movements ENABLE ROW LEVEL SECURITY")
+    op.execute(POLICY.format(table="stock_movements"))
+    op.execute("DROP TABLE movement_idempotency_keys")
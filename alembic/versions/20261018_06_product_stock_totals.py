@@ -0,0 +1,52 @@
+"""per-product stock totals
+
+Revision ID: 20261018_06
+Revises: 20261018_05
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "20261018_06"
+down_revision = "20261018_05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_stock_totals",
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("qty", sa.Numeric(14, 3), nullable=False, server_default="0"),
+    )
+    op.execute("ALTER TABLE product_stock_totals ENABLE ROW LEVEL SECURITY")
+    op.execute(
+        """
+        CREATE POLICY tenant_isolation_product_stock_totals
+        ON product_stock_totals
+        USING (
+            current_setting('app.is_superadmin', true) = 'on'
+            OR tenant_id = current_setting('app.tenant_id', true)::uuid
+        )
+        WITH CHECK (
+            current_setting('app.is_superadmin', true) = 'on'
+            OR tenant_id = current_setting('app.tenant_id', true)::uuid
+        )
+        """
+    )
+    # Block balance writers until commit so the backfill cannot miss a concurrent movement.
+    op.execute("LOCK TABLE inventory_balances IN SHARE MODE")
+    op.execute(
+        """
+        INSERT INTO product_stock_totals (tenant_id, product_id, qty)
+        SELECT tenant_id, product_id, sum(qty) FROM inventory_balances GROUP BY tenant_id, product_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP POLICY IF EXISTS tenant_isolation_product_stock_totals ON product_stock_totals")
+    op.drop_table("product_stock_totals")
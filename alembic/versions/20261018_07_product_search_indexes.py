@@ -0,0 +1,28 @@
+"""product search indexes
+
+Revision ID: 20261018_07
+Revises: 20261018_06
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "20261018_07"
+down_revision = "20261018_06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Both are trusted extensions: the database owner can create them without superuser.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_tenant_sku_prefix ON products (tenant_id, lower(sku) text_pattern_ops)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_tenant_name_trgm ON products USING gin (tenant_id, name gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_tenant_name_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_tenant_sku_prefix")
@@ -1,21 +1,26 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from urllib.parse import urlencode
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import SessionLocal, get_db
+from app.core.principal_cache import principal_cache
 from app.core.security import decode_token
-from app.core.tenant import set_tenant_context
+from app.core.tenant import LONG_RUNNING_TIMEOUTS, WRITE_TIMEOUTS, set_tenant_context
+from app.core.versions import current_version, etag
 from app.models import RoleEnum, User, UserTenant
 
 bearer_scheme = HTTPBearer(auto_error=True)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Principal:
     user_id: UUID
     tenant_id: UUID
@@ -23,31 +28,80 @@ class Principal:
     email: str
 
 
-def get_current_principal(
-    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: Session = Depends(get_db)
+async def get_current_principal(
+    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_db)
 ) -> Principal:
     payload = decode_token(creds.credentials)
     if payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid access token")
     user_id = UUID(payload["sub"])
     tenant_id = UUID(payload["tenant_id"])
-    membership = db.scalar(select(UserTenant).where(UserTenant.user_id == user_id, UserTenant.tenant_id == tenant_id))
-    if not membership:
+    principal = principal_cache.get((user_id, tenant_id))
+    if principal is None:
+        principal = await _load_principal(db, user_id, tenant_id)
+        principal_cache.set((user_id, tenant_id), principal)
+    return principal
+
+
+async def _load_principal(db: AsyncSession, user_id: UUID, tenant_id: UUID) -> Principal:
+    row = (
+        await db.execute(
+            select(UserTenant.role, User.email, User.is_active)
+            .join(User, User.id == UserTenant.user_id)
+            .where(UserTenant.user_id == user_id, UserTenant.tenant_id == tenant_id)
+        )
+    ).first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Membership not found")
-    user = db.get(User, user_id)
-    if not user or not user.is_active:
+    if not row.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive")
-    return Principal(user_id=user_id, tenant_id=tenant_id, role=membership.role, email=user.email)
+    return Principal(user_id=user_id, tenant_id=tenant_id, role=row.role, email=row.email)
 
 
-def get_tenant_db(
-    principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)
-):
-    is_superadmin = settings.superadmin_bypass_rls and principal.role == RoleEnum.ADMIN
-    set_tenant_context(db, principal.tenant_id, is_superadmin=is_superadmin)
+async def get_tenant_db(
+    principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)
+) -> AsyncSession:
+    await set_tenant_context(db, principal.tenant_id, is_superadmin=_is_superadmin(principal))
     return db
 
 
+async def get_tenant_write_db(
+    principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)
+) -> AsyncSession:
+    """Tenant session for the movement write path, with the tighter WRITE timeouts."""
+    await set_tenant_context(db, principal.tenant_id, is_superadmin=_is_superadmin(principal), timeouts=WRITE_TIMEOUTS)
+    return db
+
+
+@asynccontextmanager
+async def tenant_session(principal: Principal) -> AsyncIterator[AsyncSession]:
+    """Tenant-scoped session owned by the caller, for work that outlives the request (streaming)."""
+    async with SessionLocal() as db:
+        await set_tenant_context(db, principal.tenant_id, is_superadmin=_is_superadmin(principal), timeouts=LONG_RUNNING_TIMEOUTS)
+        yield db
+
+
+def _is_superadmin(principal: Principal) -> bool:
+    return settings.superadmin_bypass_rls and principal.role == RoleEnum.ADMIN
+
+
+def conditional_get(resource: str):
+    """Answer 304 from the tenant's version of ``resource`` before the endpoint queries anything."""
+
+    async def checker(request: Request, response: Response, principal: Principal = Depends(get_current_principal)) -> None:
+        version = await current_version(principal.tenant_id, resource)
+        if version is None:
+            return
+        # Pagination and filters select different bodies under the same version.
+        tag = etag(principal.tenant_id, resource, version, urlencode(sorted(request.query_params.multi_items())))
+        candidates = {value.strip() for value in request.headers.get("if-none-match", "").split(",")}
+        if tag in candidates or "*" in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+        response.headers["ETag"] = tag
+
+    return checker
+
+
 def require_roles(*allowed: RoleEnum):
     def checker(principal: Principal = Depends(get_current_principal)) -> Principal:
         if principal.role not in allowed:
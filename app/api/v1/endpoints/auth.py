@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import Principal, get_current_principal
 from app.core.db import get_db
-from app.models import User
+from app.core.query_budget import query_budget
 from app.schemas.auth import LoginRequest, MeResponse, RefreshRequest, RegisterTenantRequest, TokenResponse
 from app.services.auth_service import AuthService
 
@@ -11,21 +11,22 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=TokenResponse, summary="Register tenant and admin")
-def register(payload: RegisterTenantRequest, db: Session = Depends(get_db)):
-    return AuthService(db).register_tenant(payload)
+async def register(payload: RegisterTenantRequest, db: AsyncSession = Depends(get_db)):
+    return await AuthService(db).register_tenant(payload)
 
 
 @router.post("/login", response_model=TokenResponse, summary="Login and get tokens")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    return AuthService(db).login(payload)
+@query_budget(4)
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
+    return await AuthService(db).login(payload)
 
 
 @router.post("/refresh", response_model=TokenResponse, summary="Rotate refresh token")
-def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
-    return AuthService(db).refresh(payload.refresh_token)
+@query_budget(4)
+async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    return await AuthService(db).refresh(payload.refresh_token)
 
 
 @router.get("/me", response_model=MeResponse, summary="Current principal")
-def me(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
-    user = db.get(User, principal.user_id)
-    return MeResponse(user_id=principal.user_id, tenant_id=principal.tenant_id, role=principal.role, email=user.email)
+async def me(principal: Principal = Depends(get_current_principal)):
+    return MeResponse(user_id=principal.user_id, tenant_id=principal.tenant_id, role=principal.role, email=principal.email)
@@ -1,30 +1,154 @@
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import Principal, get_current_principal, get_tenant_db, require_roles
+from app.api.deps import (
+    Principal,
+    conditional_get,
+    get_current_principal,
+    get_tenant_db,
+    get_tenant_write_db,
+    require_roles,
+    tenant_session,
+)
+from app.core.export import DataFormat, export_response
+from app.core.pagination import set_next_cursor
+from app.core.query_budget import query_budget
+from app.core.versions import BALANCES
 from app.models import RoleEnum
-from app.schemas.inventory import BalanceOut, MovementCreate, MovementOut
+from app.schemas.inventory import (
+    BalanceOut,
+    MovementBatchCreate,
+    MovementBatchResult,
+    MovementCreate,
+    MovementOut,
+    StockSummaryOut,
+    ValuationOut,
+)
 from app.services.inventory_service import InventoryService
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
 
 @router.post("/movements", response_model=MovementOut, summary="Create stock movement")
-def create_movement(
+@query_budget(6)
+async def create_movement(
     payload: MovementCreate,
     principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER, RoleEnum.CLERK)),
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_write_db),
 ):
-    return InventoryService(db, principal.tenant_id, principal.user_id).move(payload)
+    return await InventoryService(db, principal.tenant_id, principal.user_id).move(payload)
 
 
-@router.get("/balances", response_model=list[BalanceOut], summary="List balances by warehouse")
-def balances(limit: int = 20, offset: int = 0, principal: Principal = Depends(get_current_principal), db: Session = Depends(get_tenant_db)):
-    return InventoryService(db, principal.tenant_id, principal.user_id).balances(limit, offset)
+@router.post("/movements/batch", response_model=MovementBatchResult, summary="Create stock movements in one transaction")
+@query_budget(10)
+async def create_movements_batch(
+    payload: MovementBatchCreate,
+    principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER, RoleEnum.CLERK)),
+    db: AsyncSession = Depends(get_tenant_write_db),
+):
+    return await InventoryService(db, principal.tenant_id, principal.user_id).move_batch(payload)
+
+
+@router.get(
+    "/balances",
+    response_model=list[BalanceOut],
+    summary="List balances by warehouse",
+    dependencies=[Depends(conditional_get(BALANCES))],
+)
+@query_budget(4)
+async def balances(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = 0,
+    cursor: str | None = None,
+    as_of: datetime | None = Query(None, description="Balances as of this instant, from the nearest snapshot plus later movements"),
+    product_id: UUID | None = None,
+    warehouse_id: UUID | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    rows, next_cursor = await InventoryService(db, principal.tenant_id, principal.user_id).balances(
+        limit, offset, cursor, as_of, product_id, warehouse_id
+    )
+    set_next_cursor(response, next_cursor)
+    return rows
+
+
+@router.get("/summary", response_model=list[StockSummaryOut], summary="On-hand quantity and value per product")
+@query_budget(2)
+async def summary(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = 0,
+    cursor: str | None = None,
+    product_id: UUID | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    rows, next_cursor = await InventoryService(db, principal.tenant_id, principal.user_id).summary(limit, offset, cursor, product_id)
+    set_next_cursor(response, next_cursor)
+    return rows
+
+
+@router.get("/valuation", response_model=ValuationOut, summary="Total on-hand quantity and value")
+@query_budget(2)
+async def valuation(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    return await InventoryService(db, principal.tenant_id, principal.user_id).valuation()
 
 
 @router.get("/kardex/{product_id}", response_model=list[MovementOut], summary="Kardex by product")
-def kardex(product_id: UUID, limit: int = 50, offset: int = 0, principal: Principal = Depends(get_current_principal), db: Session = Depends(get_tenant_db)):
-    return InventoryService(db, principal.tenant_id, principal.user_id).kardex(product_id, limit, offset)
+@query_budget(2)
+async def kardex(
+    product_id: UUID,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = 0,
+    cursor: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    rows, next_cursor = await InventoryService(db, principal.tenant_id, principal.user_id).kardex(
+        product_id, limit, offset, cursor, date_from, date_to
+    )
+    set_next_cursor(response, next_cursor)
+    return rows
+
+
+@router.get("/export/kardex", summary="Stream the ledger as NDJSON or CSV")
+async def export_kardex(
+    export_format: DataFormat = Query(DataFormat.NDJSON, alias="format"),
+    product_id: UUID | None = None,
+    warehouse_id: UUID | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    principal: Principal = Depends(get_current_principal),
+):
+    async def rows():
+        async with tenant_session(principal) as db:
+            service = InventoryService(db, principal.tenant_id, principal.user_id)
+            async for row in service.stream_kardex(product_id, warehouse_id, date_from, date_to):
+                yield row
+
+    return export_response(rows(), MovementOut, export_format, "kardex")
+
+
+@router.get("/export/balances", summary="Stream balances as NDJSON or CSV")
+async def export_balances(
+    export_format: DataFormat = Query(DataFormat.NDJSON, alias="format"),
+    warehouse_id: UUID | None = None,
+    principal: Principal = Depends(get_current_principal),
+):
+    async def rows():
+        async with tenant_session(principal) as db:
+            async for row in InventoryService(db, principal.tenant_id, principal.user_id).stream_balances(warehouse_id):
+                yield row
+
+    return export_response(rows(), BalanceOut, export_format, "balances")
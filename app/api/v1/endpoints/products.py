@@ -1,35 +1,76 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import Principal, get_current_principal, get_tenant_db, require_roles
+from app.api.deps import Principal, conditional_get, get_current_principal, get_tenant_db, require_roles
+from app.core.export import DataFormat
+from app.core.pagination import set_next_cursor
+from app.core.query_budget import query_budget
+from app.core.versions import PRODUCTS
 from app.models import RoleEnum
-from app.schemas.product import ProductCreate, ProductOut, ProductUpdate
+from app.schemas.product import ProductCreate, ProductImportResult, ProductOut, ProductUpdate
 from app.services.product_service import ProductService
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
 @router.post("", response_model=ProductOut)
-def create_product(
+async def create_product(
     payload: ProductCreate,
     principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER, RoleEnum.CLERK)),
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db),
 ):
-    return ProductService(db, principal.tenant_id).create(payload)
+    return await ProductService(db, principal.tenant_id).create(payload)
 
 
-@router.get("", response_model=list[ProductOut])
-def list_products(limit: int = 20, offset: int = 0, principal: Principal = Depends(get_current_principal), db: Session = Depends(get_tenant_db)):
-    return ProductService(db, principal.tenant_id).list(limit, offset)
+@router.post("/import", response_model=ProductImportResult, summary="Bulk import products from CSV or NDJSON")
+async def import_products(
+    file: UploadFile,
+    data_format: DataFormat | None = Query(None, alias="format"),
+    principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER)),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    if data_format is None:
+        data_format = DataFormat.CSV if (file.filename or "").lower().endswith(".csv") else DataFormat.NDJSON
+    return await ProductService(db, principal.tenant_id).import_catalog(file.file, data_format)
+
+
+@router.get("", response_model=list[ProductOut], dependencies=[Depends(conditional_get(PRODUCTS))])
+@query_budget(2)
+async def list_products(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = 0,
+    cursor: str | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    products, next_cursor = await ProductService(db, principal.tenant_id).list(limit, offset, cursor)
+    set_next_cursor(response, next_cursor)
+    return products
+
+
+@router.get("/search", response_model=list[ProductOut], summary="Search products by SKU prefix or fuzzy name")
+@query_budget(2)
+async def search_products(
+    response: Response,
+    q: str = Query(min_length=2, max_length=150),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    products, next_cursor = await ProductService(db, principal.tenant_id).search(q, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return products
 
 
 @router.patch("/{product_id}", response_model=ProductOut)
-def update_product(
+async def update_product(
     product_id: UUID,
     payload: ProductUpdate,
     principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER)),
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db),
 ):
-    return ProductService(db, principal.tenant_id).update(product_id, payload)
+    return await ProductService(db, principal.tenant_id).update(product_id, payload)
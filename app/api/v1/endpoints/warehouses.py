@@ -1,9 +1,12 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import Principal, get_current_principal, get_tenant_db, require_roles
+from app.api.deps import Principal, conditional_get, get_current_principal, get_tenant_db, require_roles
+from app.core.pagination import set_next_cursor
+from app.core.query_budget import query_budget
+from app.core.versions import WAREHOUSES
 from app.models import RoleEnum
 from app.schemas.warehouse import WarehouseCreate, WarehouseOut, WarehouseUpdate
 from app.services.warehouse_service import WarehouseService
@@ -12,24 +15,34 @@ router = APIRouter(prefix="/warehouses", tags=["warehouses"])
 
 
 @router.post("", response_model=WarehouseOut)
-def create_warehouse(
+async def create_warehouse(
     payload: WarehouseCreate,
     principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER)),
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db),
 ):
-    return WarehouseService(db, principal.tenant_id).create(payload)
-
-
-@router.get("", response_model=list[WarehouseOut])
-def list_warehouses(limit: int = 20, offset: int = 0, principal: Principal = Depends(get_current_principal), db: Session = Depends(get_tenant_db)):
-    return WarehouseService(db, principal.tenant_id).list(limit, offset)
+    return await WarehouseService(db, principal.tenant_id).create(payload)
+
+
+@router.get("", response_model=list[WarehouseOut], dependencies=[Depends(conditional_get(WAREHOUSES))])
+@query_budget(3)
+async def list_warehouses(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = 0,
+    cursor: str | None = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_tenant_db),
+):
+    warehouses, next_cursor = await WarehouseService(db, principal.tenant_id).list(limit, offset, cursor)
+    set_next_cursor(response, next_cursor)
+    return warehouses
 
 
 @router.patch("/{warehouse_id}", response_model=WarehouseOut)
-def update_warehouse(
+async def update_warehouse(
     warehouse_id: UUID,
     payload: WarehouseUpdate,
     principal: Principal = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.MANAGER)),
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db),
 ):
-    return WarehouseService(db, principal.tenant_id).update(warehouse_id, payload)
+    return await WarehouseService(db, principal.tenant_id).update(warehouse_id, payload)
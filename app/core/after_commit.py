@@ -0,0 +1,36 @@
+"""Async side effects that must only happen once a transaction has committed.
+
+``after_commit`` hooks run synchronously inside the session, so they must not do
+network I/O on the event loop. They queue coroutine factories with ``defer``
+instead, and ``CommitSession.commit`` awaits them as soon as the commit returns.
+Tasks queued by a transaction that rolls back are never queued in the first
+place, because the hooks only fire on commit.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_KEY = "after_commit_tasks"
+
+
+def defer(session: Session, task: Callable[[], Awaitable[None]]) -> None:
+    session.info.setdefault(_QUEUE_KEY, []).append(task)
+
+
+async def run_deferred(session: Session) -> None:
+    for task in session.info.pop(_QUEUE_KEY, ()):
+        try:
+            await task()
+        except Exception:
+            logger.exception("after-commit task failed")
+
+
+class CommitSession(AsyncSession):
+    async def commit(self) -> None:
+        await super().commit()
+        await run_deferred(self.sync_session)
@@ -0,0 +1,164 @@
+"""Tenant-namespaced cache for catalog rows (products, warehouses).
+
+Movements check their product and warehouses here and fill the entries they had
+to load. Entries are the API read models, never session-bound ORM objects, so
+they are only used for reads and existence checks; writes load the row for
+update and invalidate the entry once the change is committed. With REDIS_URL
+configured, each (tenant, kind) is one Redis hash capped at
+CATALOG_CACHE_MAX_ENTRIES_PER_TENANT fields; without it, a bounded in-process
+LRU per tenant is used instead.
+
+Every invalidation also bumps a per-(tenant, kind) generation. A fill only
+lands if the generation is still the one read before loading, so a reader that
+loaded a row before an update committed cannot put the old value back after
+the update invalidated it.
+"""
+
+import logging
+import threading
+import time
+from typing import Generic, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import CATALOG_CACHE_EVICTIONS, CATALOG_CACHE_REQUESTS
+from app.core.redis import get_async_redis
+from app.schemas.product import ProductOut
+from app.schemas.warehouse import WarehouseOut
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+# KEYS: entries hash, generation. ARGV: generation seen before loading, field, entry, ttl, max entries, eviction count.
+# Returns -1 when the generation moved (the fill is dropped), else the number of entries evicted.
+_FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+  return -1
+end
+local evicted = 0
+if redis.call('HLEN', KEYS[1]) >= tonumber(ARGV[5]) then
+  -- Random eviction of a tenth of the tenant's entries keeps the bound without tracking recency.
+  local doomed = redis.call('HRANDFIELD', KEYS[1], ARGV[6])
+  if #doomed > 0 then
+    evicted = redis.call('HDEL', KEYS[1], unpack(doomed))
+  end
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return evicted
+"""
+
+
+class CatalogCache(Generic[M]):
+    def __init__(self, kind: str, model: type[M], ttl_seconds: float, max_entries_per_tenant: int):
+        self.kind = kind
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries_per_tenant
+        self._local: dict[UUID, TTLCache] = {}
+        self._generations: dict[UUID, int] = {}
+        self._lock = threading.RLock()
+
+    def _key(self, tenant_id: UUID) -> str:
+        return f"verum:catalog:{tenant_id}:{self.kind}"
+
+    def _generation_key(self, tenant_id: UUID) -> str:
+        return f"verum:catalog:{tenant_id}:{self.kind}:generation"
+
+    def _tenant_cache(self, tenant_id: UUID) -> TTLCache:
+        with self._lock:
+            cache = self._local.get(tenant_id)
+            if cache is None:
+                cache = self._local[tenant_id] = TTLCache(self.max_entries, self.ttl_seconds)
+            return cache
+
+    async def read(self, tenant_id: UUID, item_id: UUID) -> tuple[M | None, str | None]:
+        """The cached entry and the tenant's current generation; the generation is None if Redis failed."""
+        client = get_async_redis()
+        if client is None:
+            with self._lock:
+                generation = str(self._generations.get(tenant_id, 0))
+            value = self._tenant_cache(tenant_id).get(item_id)
+        else:
+            try:
+                pipeline = client.pipeline(transaction=False)
+                pipeline.hget(self._key(tenant_id), str(item_id)).get(self._generation_key(tenant_id))
+                raw, generation = await pipeline.execute()
+                generation = generation.decode() if generation is not None else "0"
+            except Exception:
+                logger.exception("catalog cache read failed")
+                raw = generation = None
+            value = None
+            if raw is not None:
+                expires_at, _, payload = raw.partition(b"\n")
+                if float(expires_at) > time.time():
+                    value = self.model.model_validate_json(payload)
+        CATALOG_CACHE_REQUESTS.labels(self.kind, "hit" if value is not None else "miss").inc()
+        return value, generation
+
+    async def get(self, tenant_id: UUID, item_id: UUID) -> M | None:
+        value, _ = await self.read(tenant_id, item_id)
+        return value
+
+    async def set(self, tenant_id: UUID, item_id: UUID, value: M, generation: str) -> None:
+        """Store ``value`` unless the tenant's entries were invalidated since ``generation`` was read."""
+        client = get_async_redis()
+        if client is None:
+            with self._lock:
+                if str(self._generations.get(tenant_id, 0)) == generation:
+                    self._tenant_cache(tenant_id).set(item_id, value)
+            return
+        entry = f"{time.time() + self.ttl_seconds}\n".encode() + value.model_dump_json().encode()
+        try:
+            evicted = await client.eval(
+                _FILL_SCRIPT,
+                2,
+                self._key(tenant_id),
+                self._generation_key(tenant_id),
+                generation,
+                str(item_id),
+                entry,
+                int(self.ttl_seconds) + 1,
+                self.max_entries,
+                max(1, self.max_entries // 10),
+            )
+        except Exception:
+            logger.exception("catalog cache write failed")
+            return
+        if evicted > 0:
+            CATALOG_CACHE_EVICTIONS.labels(self.kind).inc(evicted)
+
+    async def invalidate(self, tenant_id: UUID, item_id: UUID | None = None) -> None:
+        """Drop one entry, or every entry of the tenant when ``item_id`` is None."""
+        client = get_async_redis()
+        if client is None:
+            with self._lock:
+                self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+                if item_id is None:
+                    self._local.pop(tenant_id, None)
+                elif tenant_id in self._local:
+                    self._local[tenant_id].delete(item_id)
+            return
+        key, generation_key = self._key(tenant_id), self._generation_key(tenant_id)
+        pipeline = client.pipeline()
+        pipeline.incr(generation_key).expire(generation_key, int(self.ttl_seconds) + 1)
+        if item_id is None:
+            pipeline.delete(key)
+        else:
+            pipeline.hdel(key, str(item_id))
+        try:
+            await pipeline.execute()
+        except Exception:
+            logger.exception("catalog cache invalidation failed")
+
+
+product_cache = CatalogCache(
+    "products", ProductOut, settings.catalog_cache_ttl_seconds, settings.catalog_cache_max_entries_per_tenant
+)
+warehouse_cache = CatalogCache(
+    "warehouses", WarehouseOut, settings.catalog_cache_ttl_seconds, settings.catalog_cache_max_entries_per_tenant
+)
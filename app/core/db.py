@@ -1,15 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+import asyncio
 
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.after_commit import CommitSession
 from app.core.config import settings
+from app.core.request_metrics import TimedQueuePool, instrument_engine
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, class_=Session)
+engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+instrument_engine(engine.sync_engine)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False, class_=CommitSession)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+    }
+
+
+async def check_database() -> str | None:
+    """None if a pooled connection answers within DB_READY_TIMEOUT_SECONDS, else the reason it did not."""
+    try:
+        async with asyncio.timeout(settings.db_ready_timeout_seconds):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except TimeoutError:
+        return "timeout"
+    except Exception as exc:
+        return type(exc).__name__
+    return None
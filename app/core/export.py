@@ -0,0 +1,51 @@
+import csv
+import enum
+import io
+from collections.abc import AsyncIterable, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+EXPORT_CHUNK_ROWS = 500
+
+
+class DataFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {DataFormat.NDJSON: "application/x-ndjson", DataFormat.CSV: "text/csv"}
+
+
+async def encode_rows(rows: AsyncIterable, schema: type[BaseModel], export_format: DataFormat) -> AsyncIterator[bytes]:
+    """Serialize rows through ``schema`` and yield the output in chunks of EXPORT_CHUNK_ROWS."""
+    buffer = io.StringIO()
+    fields = list(schema.model_fields)
+    writer = csv.writer(buffer) if export_format == DataFormat.CSV else None
+    if writer is not None:
+        writer.writerow(fields)
+    pending = 0
+    async for row in rows:
+        item = schema.model_validate(row)
+        if writer is not None:
+            data = item.model_dump(mode="json")
+            writer.writerow([data[field] for field in fields])
+        else:
+            buffer.write(item.model_dump_json())
+            buffer.write("\n")
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(rows: AsyncIterable, schema: type[BaseModel], export_format: DataFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        encode_rows(rows, schema, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
@@ -0,0 +1,57 @@
+"""Password hashing off the event loop.
+
+argon2 is CPU-bound and holds the GIL, so running it in the default thread pool
+still stalls every other request on the worker. Hashes run in a small process
+pool instead, and callers beyond ``PASSWORD_HASH_MAX_PENDING`` are shed with 429
+rather than queued behind a login storm.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.security import hash_password, verify_and_update_password
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(settings.password_hash_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_hash_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent authentication requests",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_and_update_async(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password; the second item is a replacement hash when the stored one is outdated."""
+    return await _run(verify_and_update_password, password, hashed_password)
@@ -0,0 +1,228 @@
+"""``Idempotency-Key`` support for every mutating endpoint.
+
+The first request with a key claims it and runs; its response (status, headers
+and body, zlib-compressed) is stored for IDEMPOTENCY_TTL_SECONDS and replayed
+byte for byte to retries, flagged with ``Idempotent-Replayed: true``. Retries
+that arrive while the first is still running wait for it instead of racing.
+Keys are scoped to the caller (tenant and user from the bearer token) and the
+route, and bound to a fingerprint of the request: reusing a key with another
+body is rejected with 422. Requests without a valid token (register, login,
+refresh) have no caller to scope by, so their keys are scoped to the client
+address and the request fingerprint instead; unrelated clients reusing a
+common key such as "1" never see each other's responses or wait on each other. 5xx, 408, 409 and 429 responses are not stored: they
+report a transient condition (load shedding, contention, a request still in
+progress), so the key is released and a retry runs again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+HEADER = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+_PENDING = b"P"
+_DONE = b"D"
+# Not replayed: they describe the original response, not the resource.
+_SKIPPED_HEADERS = {b"date", b"server"}
+# Transient outcomes below 500 that a retry with the same key should re-run.
+_RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class MemoryStore:
+    """In-process fallback with the subset of the async Redis API the middleware needs."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ex: int, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return False
+            self._data[key] = (time.monotonic() + ex, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    async def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._live(key)
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_memory_store = MemoryStore(settings.idempotency_max_entries)
+
+
+def _store():
+    return get_async_redis() or _memory_store
+
+
+def _encode(fingerprint: str, status: int, headers: list[tuple[bytes, bytes]], body: bytes) -> bytes:
+    meta = json.dumps({"fp": fingerprint, "status": status, "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers]})
+    return _DONE + meta.encode() + b"\n" + zlib.compress(body)
+
+
+def _decode(record: bytes) -> tuple[str, int, list[tuple[bytes, bytes]], bytes]:
+    meta, _, body = record[1:].partition(b"\n")
+    data = json.loads(meta)
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in data["headers"]]
+    return data["fp"], data["status"], headers, zlib.decompress(body)
+
+
+def _caller(scope: Scope, headers: Headers, fingerprint: str) -> str:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = decode_token(token)
+            return f"{payload['tenant_id']}:{payload['sub']}"
+        except (ValueError, KeyError):
+            pass
+    host = scope["client"][0] if scope.get("client") else "unknown"
+    return f"anonymous:{host}:{fingerprint}"
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Idempotency-Key too long"}, status_code=400)(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+        store_key = "verum:idempotency:" + hashlib.sha256(f"{_caller(scope, headers, fingerprint)}:{scope['method']}:{scope['path']}:{key}".encode()).hexdigest()
+
+        store = _store()
+        deadline = time.monotonic() + settings.idempotency_wait_seconds
+        while True:
+            try:
+                claimed = await store.set(store_key, _PENDING + fingerprint.encode(), ex=settings.idempotency_lock_seconds, nx=True)
+                record = None if claimed else await store.get(store_key)
+            except Exception:
+                logger.exception("idempotency store unavailable; running request without a key")
+                await self.app(scope, _replay_body(body, receive), send)
+                return
+            if claimed:
+                break
+            if record is not None and record.startswith(_DONE):
+                stored_fingerprint, status, stored_headers, stored_body = _decode(record)
+                if stored_fingerprint != fingerprint:
+                    await _mismatch(scope, receive, send)
+                    return
+                await _send_stored(send, status, stored_headers, stored_body)
+                return
+            if record is not None and record[1:].decode() != fingerprint:
+                await _mismatch(scope, receive, send)
+                return
+            if time.monotonic() >= deadline:
+                await JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409, headers={"Retry-After": "1"}
+                )(scope, receive, send)
+                return
+            await asyncio.sleep(0.05)
+
+        started: Message = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                started.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body, receive), capture)
+        except BaseException:
+            await _release(store, store_key)
+            raise
+        status = started.get("status", 500)
+        if status >= 500 or status in _RETRYABLE_STATUSES:
+            await _release(store, store_key)
+            return
+        stored_headers = [(k, v) for k, v in started.get("headers", []) if k.lower() not in _SKIPPED_HEADERS]
+        try:
+            await store.set(store_key, _encode(fingerprint, status, stored_headers, b"".join(chunks)), ex=settings.idempotency_ttl_seconds)
+        except Exception:
+            logger.exception("idempotent response could not be stored")
+            await _release(store, store_key)
+
+
+async def _release(store, key: str) -> None:
+    try:
+        await store.delete(key)
+    except Exception:
+        logger.exception("idempotency key could not be released")
+
+
+async def _read_body(receive: Receive) -> bytes:
+    parts = []
+    while True:
+        message = await receive()
+        parts.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(parts)
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    """Hand the buffered body to the app, then fall through to the connection (disconnects)."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+async def _send_stored(send: Send, status: int, headers: list[tuple[bytes, bytes]], body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": [*headers, (REPLAYED_HEADER.lower().encode(), b"true")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _mismatch(scope: Scope, receive: Receive, send: Send) -> None:
+    await JSONResponse({"detail": "Idempotency-Key was already used with a different request"}, status_code=422)(scope, receive, send)
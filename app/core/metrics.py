@@ -0,0 +1,32 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+OUTBOX_PUBLISHED = Counter("outbox_events_published_total", "Outbox events delivered to the broker")
+OUTBOX_FAILED = Counter("outbox_publish_failures_total", "Outbox events whose delivery failed and was rescheduled")
+OUTBOX_LAG = Gauge("outbox_lag_seconds", "Age of the oldest unpublished outbox event")
+OUTBOX_BATCH_SECONDS = Histogram("outbox_batch_seconds", "Time to claim, publish and commit one outbox batch")
+
+CATALOG_CACHE_REQUESTS = Counter("catalog_cache_requests_total", "Catalog cache lookups", ["kind", "result"])
+CATALOG_CACHE_EVICTIONS = Counter("catalog_cache_evictions_total", "Catalog cache entries evicted by the per-tenant bound", ["kind"])
+
+DB_RETRIES = Counter("db_retries_total", "Transactions retried after a deadlock, serialization failure or lock timeout", ["operation", "reason"])
+DB_RETRIES_EXHAUSTED = Counter("db_retries_exhausted_total", "Transactions that still failed after the retry budget", ["operation", "reason"])
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "API request latency by route template", ["method", "route", "status"])
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "API requests being handled", ["method", "route"], multiprocess_mode="livesum")
+SQL_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement latency by the route that ran it",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SQL_REQUEST_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements run by one request", ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+SQL_REQUEST_SECONDS = Histogram("db_time_per_request_seconds", "Total SQL time of one request", ["route"])
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Wait for a pooled connection, including connects",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Pooled connections in use", multiprocess_mode="livesum")
+DB_POOL_SATURATION = Gauge("db_pool_saturation", "Pooled connections in use over pool_size + max_overflow", multiprocess_mode="livemax")
@@ -0,0 +1,94 @@
+"""Cache of authenticated principals keyed by (user_id, tenant_id).
+
+Entries are evicted when a membership or user row changes. With REDIS_URL
+configured, evictions are broadcast so every worker drops its copy.
+"""
+
+import logging
+from functools import partial
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.after_commit import defer
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+from app.models import User, UserTenant
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "verum:principal-invalidate"
+_PENDING_KEY = "principal_invalidations"
+
+principal_cache = TTLCache(settings.principal_cache_max_entries, settings.principal_cache_ttl_seconds)
+
+
+def _evict(user_id: UUID, tenant_id: UUID | None) -> None:
+    if tenant_id is None:
+        principal_cache.delete_where(lambda key: key[0] == user_id)
+    else:
+        principal_cache.delete((user_id, tenant_id))
+
+
+async def _broadcast(user_id: UUID, tenant_id: UUID | None) -> None:
+    client = get_async_redis()
+    if client is None:
+        return
+    try:
+        await client.publish(INVALIDATION_CHANNEL, f"{user_id}:{tenant_id or '*'}")
+    except Exception:
+        logger.exception("principal invalidation broadcast failed")
+
+
+async def invalidate_principal(user_id: UUID, tenant_id: UUID | None = None) -> None:
+    """Drop cached principals for a user, in one tenant or in all of them."""
+    _evict(user_id, tenant_id)
+    await _broadcast(user_id, tenant_id)
+
+
+def _on_message(message: dict) -> None:
+    user_part, _, tenant_part = message["data"].decode().partition(":")
+    _evict(UUID(user_part), None if tenant_part == "*" else UUID(tenant_part))
+
+
+def start_invalidation_listener():
+    """Subscribe to remote evictions; returns the worker thread or None."""
+    client = get_redis()
+    if client is None:
+        return None
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_message})
+    return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+def _mark(target, user_id: UUID, tenant_id: UUID | None) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add((user_id, tenant_id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    _mark(target, target.id, None)
+
+
+@event.listens_for(UserTenant, "after_update")
+@event.listens_for(UserTenant, "after_delete")
+def _membership_changed(mapper, connection, target: UserTenant) -> None:
+    _mark(target, target.user_id, target.tenant_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    for user_id, tenant_id in session.info.pop(_PENDING_KEY, ()):
+        _evict(user_id, tenant_id)
+        defer(session, partial(_broadcast, user_id, tenant_id))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_invalidations(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,98 @@
+"""SQL statement budgets per endpoint, enforced by the test suite.
+
+Endpoints declare the most statements one request may run, next to the route:
+
+    @router.get("/balances")
+    @query_budget(4)
+    async def balances(...): ...
+
+The budget covers everything the request runs, tenant context and principal
+lookup included. ``app/tests/query_budget.py`` installs ``QueryBudgetMiddleware``
+for every test, so a lazy load or a per-row query added to a budgeted
+endpoint fails whichever test exercises it, with the statements that ran.
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+F = TypeVar("F", bound=Callable)
+
+
+def query_budget(statements: int) -> Callable[[F], F]:
+    def decorate(endpoint: F) -> F:
+        endpoint.query_budget = statements
+        return endpoint
+
+    return decorate
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class StatementLog:
+    statements: list[str] = field(default_factory=list)
+    closed: bool = False
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        return "\n".join(f"  {i}. {' '.join(statement.split())}" for i, statement in enumerate(self.statements, 1))
+
+
+_current: ContextVar[StatementLog | None] = ContextVar("statement_log", default=None)
+# Called with (scope, log) after every request the middleware sees.
+request_hooks: list[Callable[[Scope, StatementLog], None]] = []
+
+
+def install(engine: Engine) -> None:
+    """Record statements into the active log; idempotent."""
+    if not event.contains(engine, "before_cursor_execute", _record):
+        event.listen(engine, "before_cursor_execute", _record)
+
+
+def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = _current.get()
+    # Background tasks inherit the context of the request that started them; they do not count against it.
+    if log is not None and not log.closed:
+        log.statements.append(statement)
+
+
+@contextmanager
+def count_statements() -> Iterator[StatementLog]:
+    """Collect the statements run in this context (not in other requests) while the block runs."""
+    log = StatementLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        log.closed = True
+        _current.reset(token)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with count_statements() as log:
+            await self.app(scope, receive, send)
+        for hook in request_hooks:
+            hook(scope, log)
+        budget = getattr(scope.get("endpoint"), "query_budget", None)
+        if budget is not None and len(log) > budget:
+            raise QueryBudgetExceeded(
+                f"{scope['method']} {scope['path']} ran {len(log)} SQL statements, budget is {budget}:\n{log.report()}"
+            )
@@ -0,0 +1,32 @@
+import asyncio
+import weakref
+from functools import lru_cache
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.config import settings
+
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncRedis] = weakref.WeakKeyDictionary()
+
+
+@lru_cache
+def get_redis() -> Redis | None:
+    """Shared Redis client, or None when REDIS_URL is not configured."""
+    if not settings.redis_url:
+        return None
+    return Redis.from_url(settings.redis_url)
+
+
+def get_async_redis() -> AsyncRedis | None:
+    """Asyncio Redis client for the running event loop, or None when REDIS_URL is not configured.
+
+    Connections belong to the loop that opened them, so each loop (one per worker) gets its own client.
+    """
+    if not settings.redis_url:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncRedis.from_url(settings.redis_url)
+    return client
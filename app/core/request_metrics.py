@@ -0,0 +1,160 @@
+"""Per-route HTTP, SQL and connection pool metrics for the API process.
+
+Requests are labelled by route template (``/api/v1/products/{product_id}``),
+never by raw path or tenant, so the number of series stays bounded. SQL
+statements are attributed to the route of the request that ran them through
+a context variable; statements run outside a request (background tasks, the
+group commit) are labelled ``background``.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import Request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_SATURATION,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    SQL_REQUEST_SECONDS,
+    SQL_REQUEST_STATEMENTS,
+    SQL_STATEMENT_SECONDS,
+)
+
+UNMATCHED = "unmatched"
+BACKGROUND = "background"
+_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+_START_KEY = "request_metrics_started"
+
+
+@dataclass
+class _RequestStats:
+    route: str = UNMATCHED
+    in_flight: bool = False
+    statements: int = 0
+    sql_seconds: float = 0.0
+    done: bool = False
+
+
+_current: ContextVar[_RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def route_template(scope: Scope) -> str:
+    """Full path template of the matched route, including the prefixes of the routers it was included with."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED
+    path = scope["path"]
+    try:
+        suffix = route.path_format.format(**scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError):
+        return template
+    return path[: len(path) - len(suffix)] + template if path.endswith(suffix) else template
+
+
+async def track_route(request: Request) -> None:
+    """App-wide dependency: runs once the route is known, before the endpoint's own dependencies."""
+    stats = _current.get()
+    if stats is None or stats.in_flight:
+        return
+    stats.route = route_template(request.scope)
+    stats.in_flight = True
+    HTTP_IN_FLIGHT.labels(_method(request.scope), stats.route).inc()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+        stats = _RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            stats.done = True
+            method = _method(scope)
+            route = stats.route if stats.in_flight else route_template(scope)
+            if stats.in_flight:
+                HTTP_IN_FLIGHT.labels(method, route).dec()
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+            SQL_REQUEST_STATEMENTS.labels(route).observe(stats.statements)
+            SQL_REQUEST_SECONDS.labels(route).observe(stats.sql_seconds)
+
+
+def _method(scope: Scope) -> str:
+    return scope["method"] if scope["method"] in _METHODS else "other"
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited, including connects."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement and publish pool usage for ``engine`` (the sync engine behind an async one)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_START_KEY].pop()
+        stats = _current.get()
+        if stats is None or stats.done:
+            SQL_STATEMENT_SECONDS.labels(BACKGROUND).observe(elapsed)
+            return
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+        SQL_STATEMENT_SECONDS.labels(stats.route).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        if context.connection is not None and context.connection.info.get(_START_KEY):
+            context.connection.info[_START_KEY].pop()
+
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    DB_POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout())
+    DB_POOL_SATURATION.set_function(lambda: engine.pool.checkedout() / capacity if capacity else 0.0)
+
+
+def metrics_response() -> Response:
+    """Prometheus exposition; with PROMETHEUS_MULTIPROC_DIR set, aggregates every worker's samples."""
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
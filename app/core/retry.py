@@ -0,0 +1,52 @@
+"""Transparent retry of transactions aborted by lock contention.
+
+Deadlocks, serialization failures and lock timeouts abort the whole
+transaction without changing anything, so the operation can run again from
+the start once the session is rolled back. Attempts are spaced with full
+jitter so the transactions that collided do not collide again in lockstep.
+"""
+
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import DB_RETRIES, DB_RETRIES_EXHAUSTED
+
+T = TypeVar("T")
+
+RETRYABLE_SQLSTATES = {"40P01": "deadlock", "40001": "serialization_failure", "55P03": "lock_timeout"}
+
+
+def retry_reason(exc: BaseException) -> str | None:
+    if not isinstance(exc, DBAPIError):
+        return None
+    return RETRYABLE_SQLSTATES.get(getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None))
+
+
+def backoff(attempt: int) -> float:
+    return random.uniform(0, min(settings.db_retry_max_delay_seconds, settings.db_retry_base_delay_seconds * 2 ** (attempt - 1)))
+
+
+async def with_retry(db: AsyncSession, operation: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run ``fn`` (which commits its own transaction), retrying contention aborts up to DB_RETRY_ATTEMPTS times."""
+    attempt = 1
+    while True:
+        try:
+            return await fn()
+        except DBAPIError as exc:
+            reason = retry_reason(exc)
+            if reason is None:
+                raise
+            await db.rollback()
+            if attempt >= settings.db_retry_attempts:
+                DB_RETRIES_EXHAUSTED.labels(operation, reason).inc()
+                raise HTTPException(503, "Database contention, retry later", headers={"Retry-After": "1"}) from exc
+            DB_RETRIES.labels(operation, reason).inc()
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
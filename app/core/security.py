@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 from datetime import datetime, timedelta, timezone
 from uuid import UUID, uuid4
 
@@ -6,17 +8,36 @@ from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+# Hashes made with other parameters are flagged by ``verify_and_update`` and rehashed on login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=settings.password_hash_memory_cost,
+    argon2__rounds=settings.password_hash_time_cost,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def hash_refresh_token(token: str) -> str:
+    """Keyed digest used to look refresh tokens up by equality.
+
+    Refresh tokens are signed, high-entropy JWTs, so a slow password hash adds
+    CPU cost without adding security.
+    """
+    return hmac.new(settings.jwt_secret.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
 def create_token(payload: dict, expires_delta: timedelta) -> str:
     to_encode = payload.copy()
     expire = datetime.now(timezone.utc) + expires_delta
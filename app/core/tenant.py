@@ -1,9 +1,55 @@
+from typing import NamedTuple
 from uuid import UUID
 
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 
-def set_tenant_context(db: Session, tenant_id: UUID, is_superadmin: bool = False) -> None:
-    db.execute(text("SELECT set_config('app.tenant_id', :tenant_id, true)"), {"tenant_id": str(tenant_id)})
-    db.execute(text("SELECT set_config('app.is_superadmin', :flag, true)"), {"flag": "on" if is_superadmin else "off"})
+TENANT_CONTEXT_KEY = "tenant_context"
+
+
+class Timeouts(NamedTuple):
+    """statement_timeout and lock_timeout in milliseconds; 0 disables."""
+
+    statement_ms: int
+    lock_ms: int
+
+
+REQUEST_TIMEOUTS = Timeouts(settings.db_statement_timeout_ms, settings.db_lock_timeout_ms)
+WRITE_TIMEOUTS = Timeouts(settings.db_write_statement_timeout_ms, settings.db_write_lock_timeout_ms)
+# Exports and jobs legitimately run long statements but should still not queue on a stuck lock.
+LONG_RUNNING_TIMEOUTS = Timeouts(0, settings.db_lock_timeout_ms)
+
+_set_context_stmt = text(
+    "SELECT set_config('app.tenant_id', :tenant_id, true), set_config('app.is_superadmin', :flag, true),"
+    " set_config('statement_timeout', :statement_timeout, true), set_config('lock_timeout', :lock_timeout, true)"
+)
+
+
+async def set_tenant_context(
+    db: AsyncSession, tenant_id: UUID, is_superadmin: bool = False, timeouts: Timeouts = REQUEST_TIMEOUTS
+) -> None:
+    """Bind the RLS context and the timeouts to the session.
+
+    The settings are transaction-local, which keeps them safe behind PgBouncer in
+    transaction mode, so they are (re)applied in a single statement at the start of
+    every transaction the session opens instead of once per request.
+    """
+    params = {
+        "tenant_id": str(tenant_id),
+        "flag": "on" if is_superadmin else "off",
+        "statement_timeout": str(timeouts.statement_ms),
+        "lock_timeout": str(timeouts.lock_ms),
+    }
+    db.info[TENANT_CONTEXT_KEY] = params
+    if db.in_transaction():
+        await db.execute(_set_context_stmt, params)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_tenant_context(session: Session, transaction, connection) -> None:
+    params = session.info.get(TENANT_CONTEXT_KEY)
+    if params is not None and not transaction.nested:
+        connection.execute(_set_context_stmt, params)
@@ -0,0 +1,94 @@
+"""Per-tenant version counters for list resources, used as ETags.
+
+Services mark a resource as changed on their session; the counter is bumped
+once the transaction commits (see ``app.core.after_commit``), so a version is
+never visible before the data it describes. With REDIS_URL configured the
+counters live in Redis and are shared by every worker; otherwise they are per
+process (single-worker deployments and tests), prefixed with a random epoch so
+a restart never reuses an ETag.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from functools import partial
+from uuid import UUID, uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.after_commit import defer
+from app.core.redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS = "products"
+WAREHOUSES = "warehouses"
+BALANCES = "balances"
+
+_PENDING_KEY = "resource_versions"
+_epoch = uuid4().hex
+_local: dict[tuple[UUID, str], int] = {}
+_lock = threading.Lock()
+
+
+def _redis_key(tenant_id: UUID, resource: str) -> str:
+    return f"verum:version:{tenant_id}:{resource}"
+
+
+async def current_version(tenant_id: UUID, resource: str) -> str | None:
+    """Opaque version of a tenant's resource, or None if it cannot be read."""
+    client = get_async_redis()
+    if client is None:
+        with _lock:
+            return f"{_epoch}:{_local.get((tenant_id, resource), 0)}"
+    key = _redis_key(tenant_id, resource)
+    try:
+        version = await client.get(key)
+        if version is None:
+            # Seed missing counters from the clock so a flushed Redis does not hand out old versions again.
+            await client.set(key, time.time_ns() // 1000, nx=True)
+            version = await client.get(key)
+    except Exception:
+        logger.exception("resource version lookup failed")
+        return None
+    return version.decode()
+
+
+async def bump(tenant_id: UUID, resource: str) -> None:
+    client = get_async_redis()
+    if client is None:
+        with _lock:
+            _local[(tenant_id, resource)] = _local.get((tenant_id, resource), 0) + 1
+        return
+    key = _redis_key(tenant_id, resource)
+    try:
+        await client.pipeline().set(key, time.time_ns() // 1000, nx=True).incr(key).execute()
+    except Exception:
+        logger.exception("resource version bump failed")
+
+
+def etag(tenant_id: UUID, resource: str, version: str, query: str = "") -> str:
+    """Weak ETag of one representation; ``query`` is the normalized query string that selected it."""
+    digest = hashlib.blake2b(f"{tenant_id}:{resource}:{version}?{query}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def mark_changed(db: AsyncSession | Session, tenant_id: UUID, *resources: str) -> None:
+    """Bump ``resources`` for the tenant when the session's current transaction commits."""
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    session.info.setdefault(_PENDING_KEY, set()).update((tenant_id, resource) for resource in resources)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_versions(session: Session) -> None:
+    for tenant_id, resource in session.info.pop(_PENDING_KEY, ()):
+        defer(session, partial(bump, tenant_id, resource))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_versions(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -1,21 +1,19 @@
-"""Outbox scaffolding for future Hacienda integration.
+"""Transactional outbox.
 
-Future:
-- Persist domain events in same DB transaction.
-- Worker (Celery/RQ) polls unpublished events and publishes to broker.
-- Mark as published with retry + backoff + idempotency key.
+Events are persisted in the same DB transaction as the change they describe;
+``app.events.relay`` delivers them to the broker and marks them published.
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import OutboxEvent
 
 
 class OutboxPublisher:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def enqueue(self, event: OutboxEvent) -> OutboxEvent:
+    async def enqueue(self, event: OutboxEvent) -> OutboxEvent:
         self.db.add(event)
-        self.db.flush()
+        await self.db.flush()
         return event
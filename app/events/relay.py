@@ -0,0 +1,164 @@
+"""Outbox relay: drains ``outbox_events`` into a broker.
+
+Run it as ``python -m app.events.relay``. Batches are claimed with
+``FOR UPDATE SKIP LOCKED`` so several relays can share the table, and the worker
+sleeps on ``LISTEN outbox_events`` (fed by an insert trigger) between batches,
+falling back to polling every ``OUTBOX_POLL_INTERVAL_SECONDS``.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+from uuid import UUID
+
+from prometheus_client import start_http_server
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal, engine
+from app.core.metrics import OUTBOX_BATCH_SECONDS, OUTBOX_FAILED, OUTBOX_LAG, OUTBOX_PUBLISHED
+from app.core.tenant import set_tenant_context
+from app.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "outbox_events"
+
+
+class Broker(Protocol):
+    async def publish(self, event: OutboxEvent) -> None: ...
+
+
+def _message(event: OutboxEvent) -> dict[str, str]:
+    return {
+        "id": str(event.id),
+        "tenant_id": str(event.tenant_id),
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": str(event.aggregate_id),
+        "event_type": event.event_type,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+class RedisStreamBroker:
+    def __init__(self, client: Redis, stream: str = settings.outbox_stream):
+        self.client = client
+        self.stream = stream
+
+    async def publish(self, event: OutboxEvent) -> None:
+        await self.client.xadd(self.stream, _message(event))
+
+
+class InMemoryBroker:
+    def __init__(self):
+        self.messages: list[dict[str, str]] = []
+
+    async def publish(self, event: OutboxEvent) -> None:
+        self.messages.append(_message(event))
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        broker: Broker,
+        session_factory: async_sessionmaker[AsyncSession] = SessionLocal,
+        batch_size: int = settings.outbox_batch_size,
+        poll_interval: float = settings.outbox_poll_interval_seconds,
+        max_backoff: float = settings.outbox_max_backoff_seconds,
+    ):
+        self.broker = broker
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.max_backoff, 2 ** (attempts - 1)))
+
+    async def relay_once(self) -> int:
+        """Claim, publish and settle one batch; returns the number of rows claimed."""
+        started = time.perf_counter()
+        async with self.session_factory() as db, db.begin():
+            await set_tenant_context(db, UUID(int=0), is_superadmin=True)
+            oldest = await db.scalar(select(func.min(OutboxEvent.created_at)).where(OutboxEvent.published_at.is_(None)))
+            now = datetime.now(timezone.utc)
+            OUTBOX_LAG.set((now - oldest).total_seconds() if oldest else 0)
+
+            events = (
+                await db.scalars(
+                    select(OutboxEvent)
+                    .where(OutboxEvent.published_at.is_(None), OutboxEvent.available_at <= now)
+                    .order_by(OutboxEvent.created_at)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            for event in events:
+                try:
+                    await self.broker.publish(event)
+                except Exception as exc:
+                    event.attempts += 1
+                    event.available_at = datetime.now(timezone.utc) + self.backoff(event.attempts)
+                    event.last_error = repr(exc)[:1000]
+                    OUTBOX_FAILED.inc()
+                    logger.warning("outbox event %s failed (attempt %s): %r", event.id, event.attempts, exc)
+                else:
+                    event.published_at = datetime.now(timezone.utc)
+                    OUTBOX_PUBLISHED.inc()
+        OUTBOX_BATCH_SECONDS.observe(time.perf_counter() - started)
+        return len(events)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        wakeup = asyncio.Event()
+
+        def notified(*_) -> None:
+            wakeup.set()
+
+        async with engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.add_listener(NOTIFY_CHANNEL, notified)
+            try:
+                while not stop.is_set():
+                    wakeup.clear()
+                    try:
+                        while await self.relay_once() >= self.batch_size and not stop.is_set():
+                            pass
+                    except Exception:
+                        logger.exception("outbox relay batch failed")
+                    waiters = [asyncio.ensure_future(wakeup.wait()), asyncio.ensure_future(stop.wait())]
+                    await asyncio.wait(waiters, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                    for waiter in waiters:
+                        waiter.cancel()
+            finally:
+                await raw.remove_listener(NOTIFY_CHANNEL, notified)
+
+
+async def _main() -> None:
+    if not settings.redis_url:
+        raise SystemExit("REDIS_URL is required to run the outbox relay")
+    start_http_server(settings.outbox_metrics_port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    client = Redis.from_url(settings.redis_url)
+    try:
+        await OutboxRelay(RedisStreamBroker(client)).run(stop)
+    finally:
+        await client.aclose()
+        await engine.dispose()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Maintain the monthly partitions of ``stock_movements``.
+
+Schedule it daily; it is idempotent:
+
+    python -m app.jobs.partitions                                # create partitions for the next 3 months
+    python -m app.jobs.partitions --retain-months 24             # also detach partitions older than 24 months
+    python -m app.jobs.partitions --retain-months 24 --drop      # ... and drop them instead of keeping them for archive
+
+Detached partitions stay as plain ``stock_movements_pYYYYMM`` tables (dump them with
+``pg_dump -t``); their idempotency keys are purged so the keys table does not grow forever.
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "stock_movements"
+_BOUND = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: datetime | None
+    upper: datetime | None
+    is_default: bool = False
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.month - 1 + months
+    return moment.replace(year=moment.year + index // 12, month=index % 12 + 1, day=1)
+
+
+def parse_bound(name: str, bound: str) -> Partition:
+    """Parse ``pg_get_expr(relpartbound)`` output; MINVALUE/MAXVALUE become None."""
+    if bound == "DEFAULT":
+        return Partition(name, None, None, is_default=True)
+    match = _BOUND.search(bound)
+    if match is None:
+        raise ValueError(f"unexpected partition bound for {name}: {bound}")
+    lower, upper = (datetime.fromisoformat(value) if value else None for value in match.groups())
+    return Partition(name, lower, upper)
+
+
+async def list_partitions(conn: AsyncConnection) -> list[Partition]:
+    rows = await conn.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:parent AS regclass)
+            """
+        ),
+        {"parent": PARENT},
+    )
+    earliest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted((parse_bound(name, bound) for name, bound in rows), key=lambda p: (p.is_default, p.lower or earliest))
+
+
+def _overlaps(partitions: list[Partition], start: datetime, end: datetime) -> bool:
+    return any(
+        (p.lower is None or p.lower < end) and (p.upper is None or start < p.upper) for p in partitions if not p.is_default
+    )
+
+
+async def create_ahead(conn: AsyncConnection, months: int, now: datetime | None = None) -> list[str]:
+    """Create missing monthly partitions from the current month up to ``months`` ahead."""
+    partitions = await list_partitions(conn)
+    first = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for offset in range(months + 1):
+        start, end = add_months(first, offset), add_months(first, offset + 1)
+        if _overlaps(partitions, start, end):
+            continue
+        name = f"{PARENT}_p{start:%Y%m}"
+        await conn.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+        )
+        partitions.append(Partition(name, start, end))
+        created.append(name)
+        logger.info("created partition %s [%s, %s)", name, start.date(), end.date())
+    return created
+
+
+async def detach_expired(
+    conn: AsyncConnection, retain_months: int, drop: bool = False, now: datetime | None = None
+) -> list[Partition]:
+    """Detach (or drop) partitions that ended more than ``retain_months`` months ago."""
+    partitions = await list_partitions(conn)
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retain_months)
+    expired = [p for p in partitions if not p.is_default and p.upper is not None and p.upper <= cutoff]
+    # CONCURRENTLY avoids blocking writers, but PostgreSQL refuses it when a default partition exists.
+    concurrently = "" if any(p.is_default for p in partitions) else " CONCURRENTLY"
+    for partition in expired:
+        await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name}{concurrently}"))
+        if drop:
+            await conn.execute(text(f"DROP TABLE {partition.name}"))
+        logger.info("%s partition %s (< %s)", "dropped" if drop else "detached", partition.name, partition.upper.date())
+    return expired
+
+
+async def maintain(bind: AsyncEngine, ahead: int = 3, retain_months: int | None = None, drop: bool = False) -> None:
+    # DETACH ... CONCURRENTLY cannot run inside a transaction block.
+    async with bind.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await create_ahead(conn, ahead)
+        expired = await detach_expired(conn, retain_months, drop) if retain_months is not None else []
+    if expired:
+        async with bind.begin() as conn:
+            await conn.execute(text("SELECT set_config('app.is_superadmin', 'on', true)"))
+            purged = await conn.execute(
+                text("DELETE FROM movement_idempotency_keys WHERE created_at < :until"), {"until": max(p.upper for p in expired)}
+            )
+        logger.info("purged %s idempotency keys", purged.rowcount)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        await maintain(engine, args.ahead, args.retain_months, args.drop)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ahead", type=int, default=3, help="months to pre-create after the current one")
+    parser.add_argument("--retain-months", type=int, help="detach partitions that ended before this many months ago")
+    parser.add_argument("--drop", action="store_true", help="drop detached partitions instead of keeping them")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Write stock snapshots for point-in-time balance queries.
+
+Schedule it daily (or monthly, for closing) shortly after midnight UTC:
+
+    python -m app.jobs.snapshots                      # all active tenants, at today 00:00 UTC
+    python -m app.jobs.snapshots --at 2026-10-01T00:00:00Z --tenant <uuid>
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.db import engine
+from app.core.tenant import LONG_RUNNING_TIMEOUTS, set_tenant_context
+from app.models import Tenant
+from app.services.snapshot_service import SnapshotService
+
+logger = logging.getLogger(__name__)
+
+
+async def snapshot_tenants(
+    taken_at: datetime, tenant_id: UUID | None = None, session_factory: async_sessionmaker[AsyncSession] | None = None
+) -> dict[UUID, int]:
+    """Snapshot each tenant in its own REPEATABLE READ transaction; returns rows written per tenant."""
+    if session_factory is None:
+        session_factory = async_sessionmaker(engine.execution_options(isolation_level="REPEATABLE READ"), expire_on_commit=False)
+    async with session_factory() as db:
+        stmt = select(Tenant.id).where(Tenant.is_active.is_(True))
+        if tenant_id:
+            stmt = stmt.where(Tenant.id == tenant_id)
+        tenant_ids = list(await db.scalars(stmt))
+
+    written: dict[UUID, int] = {}
+    for current in tenant_ids:
+        async with session_factory() as db:
+            await set_tenant_context(db, current, timeouts=LONG_RUNNING_TIMEOUTS)
+            written[current] = await SnapshotService(db, current).take(taken_at)
+            await db.commit()
+        logger.info("snapshot tenant=%s taken_at=%s rows=%s", current, taken_at.isoformat(), written[current])
+    return written
+
+
+def _utc(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        await snapshot_tenants(args.at, args.tenant)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    parser.add_argument("--at", type=_utc, default=today)
+    parser.add_argument("--tenant", type=UUID)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
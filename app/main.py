@@ -1,29 +1,74 @@
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.db import check_database, engine, pool_status
+from app.core.hashing import shutdown_hash_pool
+from app.core.idempotency import REPLAYED_HEADER, IdempotencyMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.principal_cache import start_invalidation_listener
+from app.core.request_metrics import RequestMetricsMiddleware, metrics_response, track_route
 
 logging.basicConfig(level=logging.INFO, format='{"level":"%(levelname)s","msg":"%(message)s"}')
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = start_invalidation_listener()
+    yield
+    if listener is not None:
+        listener.stop()
+    shutdown_hash_pool()
+    await engine.dispose()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name, version="0.1.0")
+    app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan, dependencies=[Depends(track_route)])
+    app.add_middleware(IdempotencyMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", REPLAYED_HEADER],
     )
+    app.add_middleware(RequestMetricsMiddleware)
     app.include_router(api_router, prefix="/api/v1")
 
+    @app.exception_handler(PoolTimeoutError)
+    async def pool_exhausted(request: Request, exc: PoolTimeoutError):
+        return JSONResponse({"detail": "No database connection available"}, status_code=503, headers={"Retry-After": "1"})
+
+    @app.exception_handler(DBAPIError)
+    async def statement_timeout(request: Request, exc: DBAPIError):
+        if getattr(exc.orig, "sqlstate", None) != "57014":
+            raise exc
+        return JSONResponse({"detail": "Database statement timed out"}, status_code=503, headers={"Retry-After": "1"})
+
     @app.get("/health", tags=["system"])
     def health():
         return {"status": "ok"}
 
+    @app.get("/ready", tags=["system"])
+    async def ready():
+        """Ready when the pool has a free slot and a pooled connection answers."""
+        pool = pool_status()
+        error = "pool exhausted" if pool["checked_out"] >= pool["capacity"] else await check_database()
+        body = {"status": "ready" if error is None else "unavailable", "database": error or "ok", "pool": pool}
+        return JSONResponse(body, status_code=200 if error is None else 503)
+
+    @app.get("/metrics", tags=["system"], include_in_schema=False)
+    def metrics():
+        return metrics_response()
+
     return app
 
 
@@ -2,12 +2,15 @@ from app.models.base import Base
 from app.models.entities import (
     Category,
     InventoryBalance,
+    MovementIdempotencyKey,
     MovementType,
     OutboxEvent,
     Product,
+    ProductStockTotal,
     RefreshToken,
     RoleEnum,
     StockMovement,
+    StockSnapshot,
     Tenant,
     User,
     UserTenant,
@@ -24,8 +27,11 @@ __all__ = [
     "Category",
     "Warehouse",
     "InventoryBalance",
+    "ProductStockTotal",
     "StockMovement",
+    "StockSnapshot",
     "MovementType",
+    "MovementIdempotencyKey",
     "RefreshToken",
     "OutboxEvent",
 ]
@@ -3,16 +3,20 @@ from datetime import datetime, timezone
 from uuid import uuid4
 
 from sqlalchemy import (
+    DDL,
     Boolean,
     CheckConstraint,
     DateTime,
     Enum,
     ForeignKey,
     Index,
+    Integer,
     Numeric,
     String,
     Text,
     UniqueConstraint,
+    event,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
@@ -88,6 +92,10 @@ class Product(Base):
         UniqueConstraint("tenant_id", "sku", name="uq_product_tenant_sku"),
         Index("ix_products_tenant_sku", "tenant_id", "sku"),
         Index("ix_products_tenant_name", "tenant_id", "name"),
+        Index("ix_products_tenant_created", "tenant_id", "created_at", "id"),
+        # Search: case-insensitive SKU prefix (btree) and fuzzy name (pg_trgm + btree_gin for tenant_id).
+        Index("ix_products_tenant_sku_prefix", "tenant_id", text("lower(sku) text_pattern_ops")),
+        Index("ix_products_tenant_name_trgm", "tenant_id", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
     )
 
 
@@ -115,7 +123,18 @@ class InventoryBalance(Base):
     )
 
 
+class ProductStockTotal(Base):
+    """On-hand quantity of a product across all warehouses, updated in the same transaction as its balances."""
+
+    __tablename__ = "product_stock_totals"
+    tenant_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    product_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    qty: Mapped[float] = mapped_column(Numeric(14, 3), default=0, nullable=False)
+
+
 class StockMovement(Base):
+    """Ledger, range-partitioned by month on ``created_at`` (see ``app.jobs.partitions``)."""
+
     __tablename__ = "stock_movements"
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     tenant_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
@@ -126,14 +145,50 @@ class StockMovement(Base):
     to_warehouse_id: Mapped[UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("warehouses.id", ondelete="SET NULL"))
     reference: Mapped[str | None] = mapped_column(String(120))
     idempotency_key: Mapped[str | None] = mapped_column(String(120))
+    # Signed balance change of an ADJUST, so the ledger can be replayed without the balance it overwrote.
+    adjust_delta: Mapped[float | None] = mapped_column(Numeric(14, 3))
     created_by: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
     __table_args__ = (
         Index("ix_movements_tenant_product_date", "tenant_id", "product_id", "created_at"),
-        UniqueConstraint("tenant_id", "idempotency_key", name="uq_movement_tenant_idempotency"),
+        Index("ix_movements_tenant_created", "tenant_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 
+# A schema built from the metadata gets a catch-all partition; migrated databases use monthly ones.
+event.listen(
+    StockMovement.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS stock_movements_default PARTITION OF stock_movements DEFAULT"),
+)
+
+
+class MovementIdempotencyKey(Base):
+    """Enforces one movement per (tenant, idempotency_key), which a partitioned table cannot do by itself."""
+
+    __tablename__ = "movement_idempotency_keys"
+    tenant_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(120), primary_key=True)
+    movement_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class StockSnapshot(Base):
+    """Balance of every non-empty (product, warehouse) pair from movements before ``taken_at``."""
+
+    __tablename__ = "stock_snapshots"
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    tenant_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    taken_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    product_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    warehouse_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("warehouses.id", ondelete="CASCADE"), nullable=False)
+    qty: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False)
+    __table_args__ = (UniqueConstraint("tenant_id", "taken_at", "product_id", "warehouse_id", name="uq_snapshot_tenant_taken_prod_wh"),)
+
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
@@ -143,6 +198,10 @@ class RefreshToken(Base):
     revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    __table_args__ = (
+        UniqueConstraint("token_hash", name="uq_refresh_token_hash"),
+        Index("ix_refresh_tokens_user_tenant", "user_id", "tenant_id"),
+    )
 
 
 class OutboxEvent(Base):
@@ -154,5 +213,11 @@ class OutboxEvent(Base):
     event_type: Mapped[str] = mapped_column(String(120), nullable=False)
     payload: Mapped[str] = mapped_column(Text, nullable=False)
     published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
-    __table_args__ = (Index("ix_outbox_tenant_created", "tenant_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_outbox_tenant_created", "tenant_id", "created_at"),
+        Index("ix_outbox_unpublished", "created_at", postgresql_where=text("published_at IS NULL")),
+    )
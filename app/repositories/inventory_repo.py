@@ -1,39 +1,215 @@
-from uuid import UUID
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import CompoundSelect, and_, func, literal, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import InventoryBalance, StockMovement
+from app.models import (
+    InventoryBalance,
+    MovementIdempotencyKey,
+    MovementType,
+    Product,
+    ProductStockTotal,
+    StockMovement,
+    Warehouse,
+)
+
+
+def ledger_effects(
+    tenant_id: UUID, since: datetime | None = None, until: datetime | None = None, product_id: UUID | None = None
+) -> CompoundSelect:
+    """(product_id, warehouse_id, qty) rows for the signed balance effect of each movement in [since, until)."""
+    window = [StockMovement.tenant_id == tenant_id]
+    if product_id is not None:
+        window.append(StockMovement.product_id == product_id)
+    if since is not None:
+        window.append(StockMovement.created_at >= since)
+    if until is not None:
+        window.append(StockMovement.created_at < until)
+
+    def effect(warehouse, qty, *where):
+        return select(StockMovement.product_id, warehouse.label("warehouse_id"), qty.label("qty")).where(*window, *where)
+
+    return union_all(
+        effect(StockMovement.to_warehouse_id, StockMovement.qty, StockMovement.type.in_([MovementType.IN, MovementType.TRANSFER])),
+        effect(StockMovement.from_warehouse_id, -StockMovement.qty, StockMovement.type.in_([MovementType.OUT, MovementType.TRANSFER])),
+        effect(
+            func.coalesce(StockMovement.to_warehouse_id, StockMovement.from_warehouse_id),
+            StockMovement.adjust_delta,
+            StockMovement.type == MovementType.ADJUST,
+            StockMovement.adjust_delta.is_not(None),
+        ),
+    )
 
 
 class InventoryRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_balance_for_update(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID) -> InventoryBalance | None:
+    async def _upsert_qty(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID, qty: Decimal, increment: bool) -> Decimal:
+        stmt = insert(InventoryBalance).values(tenant_id=tenant_id, product_id=product_id, warehouse_id=warehouse_id, qty=qty)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "product_id", "warehouse_id"],
+            set_={"qty": InventoryBalance.qty + stmt.excluded.qty if increment else stmt.excluded.qty},
+        ).returning(InventoryBalance.qty)
+        return await self.db.scalar(stmt)
+
+    async def add_qty(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID, qty: Decimal) -> Decimal:
+        """Add to a balance, creating it if missing; returns the new quantity."""
+        return await self._upsert_qty(tenant_id, product_id, warehouse_id, qty, increment=True)
+
+    async def set_qty(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID, qty: Decimal) -> Decimal:
+        return await self._upsert_qty(tenant_id, product_id, warehouse_id, qty, increment=False)
+
+    async def lock_balance(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID) -> Decimal:
+        """Lock a balance row, creating it if missing, and return its quantity."""
+        stmt = insert(InventoryBalance).values(tenant_id=tenant_id, product_id=product_id, warehouse_id=warehouse_id, qty=0)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "product_id", "warehouse_id"], set_={"qty": InventoryBalance.qty}
+        ).returning(InventoryBalance.qty)
+        return await self.db.scalar(stmt)
+
+    async def remove_qty(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID, qty: Decimal) -> Decimal | None:
+        """Subtract from a balance; returns None, changing nothing, when stock is insufficient."""
         stmt = (
-            select(InventoryBalance)
+            update(InventoryBalance)
             .where(
                 InventoryBalance.tenant_id == tenant_id,
                 InventoryBalance.product_id == product_id,
                 InventoryBalance.warehouse_id == warehouse_id,
+                InventoryBalance.qty >= qty,
             )
+            .values(qty=InventoryBalance.qty - qty)
+            .returning(InventoryBalance.qty)
+            .execution_options(synchronize_session=False)
+        )
+        return await self.db.scalar(stmt)
+
+    async def lock_balances(self, tenant_id: UUID, pairs: set[tuple[UUID, UUID]]) -> dict[tuple[UUID, UUID], InventoryBalance]:
+        """Create missing balance rows, then lock every (product_id, warehouse_id) pair.
+
+        Rows are inserted and locked in sorted order so concurrent batches touching
+        overlapping pairs queue behind each other instead of deadlocking.
+        """
+        ordered = sorted(pairs)
+        await self.db.execute(
+            insert(InventoryBalance)
+            .values([{"tenant_id": tenant_id, "product_id": p, "warehouse_id": w, "qty": 0} for p, w in ordered])
+            .on_conflict_do_nothing(index_elements=["tenant_id", "product_id", "warehouse_id"])
+        )
+        stmt = (
+            select(InventoryBalance)
+            .where(
+                InventoryBalance.tenant_id == tenant_id,
+                tuple_(InventoryBalance.product_id, InventoryBalance.warehouse_id).in_(ordered),
+            )
+            .order_by(InventoryBalance.product_id, InventoryBalance.warehouse_id)
             .with_for_update()
         )
-        return self.db.scalar(stmt)
+        return {(b.product_id, b.warehouse_id): b for b in await self.db.scalars(stmt)}
 
-    def create_balance(self, tenant_id: UUID, product_id: UUID, warehouse_id: UUID) -> InventoryBalance:
-        b = InventoryBalance(tenant_id=tenant_id, product_id=product_id, warehouse_id=warehouse_id, qty=0)
-        self.db.add(b)
-        self.db.flush()
-        return b
+    async def add_totals(self, tenant_id: UUID, deltas: dict[UUID, Decimal]) -> None:
+        """Apply net per-product quantity changes to ``product_stock_totals``.
 
-    def add_movement(self, movement: StockMovement) -> StockMovement:
+        One upsert for all products, in product order, so concurrent batches lock
+        the total rows in the same order as they lock balances.
+        """
+        rows = [{"tenant_id": tenant_id, "product_id": p, "qty": delta} for p, delta in sorted(deltas.items()) if delta]
+        if not rows:
+            return
+        stmt = insert(ProductStockTotal).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "product_id"], set_={"qty": ProductStockTotal.qty + stmt.excluded.qty}
+        )
+        await self.db.execute(stmt)
+
+    async def existing_references(
+        self, tenant_id: UUID, product_ids: set[UUID], warehouse_ids: set[UUID]
+    ) -> tuple[set[UUID], set[UUID]]:
+        """Return which of the given product and warehouse ids exist, in one query."""
+        parts = [select(literal("product").label("kind"), Product.id).where(Product.tenant_id == tenant_id, Product.id.in_(product_ids))]
+        if warehouse_ids:
+            parts.append(
+                select(literal("warehouse").label("kind"), Warehouse.id).where(Warehouse.tenant_id == tenant_id, Warehouse.id.in_(warehouse_ids))
+            )
+        rows = (await self.db.execute(union_all(*parts))).all()
+        return {row.id for row in rows if row.kind == "product"}, {row.id for row in rows if row.kind == "warehouse"}
+
+    async def move_references(
+        self, tenant_id: UUID, product_id: UUID, warehouse_ids: set[UUID]
+    ) -> tuple[Product | None, list[Warehouse]]:
+        """The product and whichever of ``warehouse_ids`` exist, in one query; no warehouses if the product is missing."""
+        stmt = (
+            select(Product, Warehouse)
+            .outerjoin(Warehouse, and_(Warehouse.tenant_id == tenant_id, Warehouse.id.in_(warehouse_ids)))
+            .where(Product.tenant_id == tenant_id, Product.id == product_id)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        return (rows[0].Product if rows else None), [row.Warehouse for row in rows if row.Warehouse is not None]
+
+    @staticmethod
+    def _key_row(movement: StockMovement) -> dict:
+        # The key row points at the movement's full primary key, so both are fixed before the insert.
+        movement.id = movement.id or uuid4()
+        movement.created_at = movement.created_at or datetime.now(timezone.utc)
+        return {
+            "tenant_id": movement.tenant_id,
+            "idempotency_key": movement.idempotency_key,
+            "movement_id": movement.id,
+            "created_at": movement.created_at,
+        }
+
+    def _claim_keys(self, movements: list[StockMovement]) -> None:
+        # Key rows flush with the movements; a duplicate key fails the flush with IntegrityError.
+        for movement in movements:
+            if movement.idempotency_key:
+                self.db.add(MovementIdempotencyKey(**self._key_row(movement)))
+
+    async def claim_key(self, movement: StockMovement) -> bool:
+        """Reserve the movement's idempotency key; False if another movement holds it.
+
+        A key inserted by a transaction still in flight blocks until that one ends,
+        so a concurrent duplicate sees the winner's movement instead of an error.
+        """
+        stmt = (
+            insert(MovementIdempotencyKey)
+            .values(self._key_row(movement))
+            .on_conflict_do_nothing(index_elements=["tenant_id", "idempotency_key"])
+            .returning(MovementIdempotencyKey.movement_id)
+        )
+        return await self.db.scalar(stmt) is not None
+
+    async def add_movements(self, movements: list[StockMovement]) -> list[StockMovement]:
+        self.db.add_all(movements)
+        self._claim_keys(movements)
+        await self.db.flush()
+        return movements
+
+    async def add_movement(self, movement: StockMovement) -> StockMovement:
+        """Insert one movement whose key, if any, was taken with ``claim_key``.
+
+        Every column is set client-side, so there is nothing to read back after the insert.
+        """
         self.db.add(movement)
-        self.db.flush()
-        self.db.refresh(movement)
+        await self.db.flush()
         return movement
 
-    def get_idempotent(self, tenant_id: UUID, key: str) -> StockMovement | None:
-        stmt = select(StockMovement).where(StockMovement.tenant_id == tenant_id, StockMovement.idempotency_key == key)
-        return self.db.scalar(stmt)
+    def _by_keys(self, tenant_id: UUID, *where):
+        # Joining on created_at as well lets each probe prune to the movement's partition.
+        return (
+            select(StockMovement)
+            .join(
+                MovementIdempotencyKey,
+                and_(MovementIdempotencyKey.movement_id == StockMovement.id, MovementIdempotencyKey.created_at == StockMovement.created_at),
+            )
+            .where(MovementIdempotencyKey.tenant_id == tenant_id, StockMovement.tenant_id == tenant_id, *where)
+        )
+
+    async def get_idempotent(self, tenant_id: UUID, key: str) -> StockMovement | None:
+        return await self.db.scalar(self._by_keys(tenant_id, MovementIdempotencyKey.idempotency_key == key))
+
+    async def get_idempotent_many(self, tenant_id: UUID, keys: set[str]) -> dict[str, StockMovement]:
+        stmt = self._by_keys(tenant_id, MovementIdempotencyKey.idempotency_key.in_(keys))
+        return {m.idempotency_key: m for m in await self.db.scalars(stmt)}
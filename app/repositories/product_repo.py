@@ -1,24 +1,95 @@
+from collections.abc import Sequence
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, Row, case, cast, func, literal, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Product
+from app.models import Category, Product
+
+IMPORT_COLUMNS = ("sku", "name", "description", "unit", "cost", "price", "category_id")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class ProductRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create(self, product: Product) -> Product:
+    async def create(self, product: Product) -> Product:
         self.db.add(product)
-        self.db.flush()
-        self.db.refresh(product)
+        await self.db.flush()
+        await self.db.refresh(product)
         return product
 
-    def list(self, limit: int, offset: int) -> list[Product]:
-        stmt = select(Product).offset(offset).limit(limit).order_by(Product.created_at.desc())
-        return list(self.db.scalars(stmt))
+    async def list(
+        self, tenant_id: UUID, limit: int, offset: int = 0, after: tuple[datetime, UUID] | None = None
+    ) -> list[Product]:
+        """Newest first; ``after`` seeks past (created_at, id) instead of using OFFSET."""
+        stmt = select(Product).where(Product.tenant_id == tenant_id).order_by(Product.created_at.desc(), Product.id.desc())
+        if after is not None:
+            stmt = stmt.where(tuple_(Product.created_at, Product.id) < after)
+        elif offset:
+            stmt = stmt.offset(offset)
+        return list(await self.db.scalars(stmt.limit(limit)))
+
+    async def search(self, tenant_id: UUID, query: str, limit: int, after: tuple[float, UUID] | None = None) -> Sequence[Row]:
+        """(Product, score) rows best match first: exact SKU, then SKU prefix, then name word similarity."""
+        term = query.lower()
+        sku_prefix = func.lower(Product.sku).like(_escape_like(term) + "%", escape="\\")
+        score = cast(case((func.lower(Product.sku) == term, 2), (sku_prefix, 1), else_=0) + func.word_similarity(query, Product.name), Float)
+        stmt = (
+            select(Product, score.label("score"))
+            .where(Product.tenant_id == tenant_id, or_(sku_prefix, literal(query).op("<%")(Product.name)))
+            .order_by(score.desc(), Product.id.desc())
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(score, Product.id) < after)
+        return (await self.db.execute(stmt.limit(limit))).all()
+
+    async def get_for_update(self, tenant_id: UUID, product_id: UUID) -> Product | None:
+        return await self.db.scalar(select(Product).where(Product.tenant_id == tenant_id, Product.id == product_id).with_for_update())
+
+    async def existing_category_ids(self, tenant_id: UUID, category_ids: set[UUID]) -> set[UUID]:
+        stmt = select(Category.id).where(Category.tenant_id == tenant_id, Category.id.in_(category_ids))
+        return set(await self.db.scalars(stmt))
+
+    async def bulk_upsert(self, tenant_id: UUID, records: Sequence[tuple]) -> tuple[int, int]:
+        """COPY ``records`` (ordered as IMPORT_COLUMNS) into a staging table and upsert by (tenant_id, sku).
 
-    def get(self, product_id: UUID) -> Product | None:
-        return self.db.get(Product, product_id)
+        Returns (inserted, updated).
+        """
+        await self.db.execute(
+            text(
+                "CREATE TEMP TABLE product_import (sku varchar(60), name varchar(150), description text, unit varchar(30), "
+                "cost numeric(12, 2), price numeric(12, 2), category_id uuid) ON COMMIT DROP"
+            )
+        )
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table("product_import", records=records, columns=IMPORT_COLUMNS)
+        counts = await self.db.execute(
+            text(
+                """
+                WITH upserted AS (
+                    INSERT INTO products (id, tenant_id, sku, name, description, unit, cost, price, category_id, is_active, created_at)
+                    SELECT gen_random_uuid(), :tenant_id, sku, name, description, unit, cost, price, category_id, true, now()
+                    FROM product_import
+                    ON CONFLICT (tenant_id, sku) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        description = EXCLUDED.description,
+                        unit = EXCLUDED.unit,
+                        cost = EXCLUDED.cost,
+                        price = EXCLUDED.price,
+                        category_id = EXCLUDED.category_id
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+                """
+            ),
+            {"tenant_id": tenant_id},
+        )
+        inserted, updated = counts.one()
+        return inserted, updated
@@ -1,23 +1,30 @@
 from uuid import UUID
 
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Warehouse
 
 
 class WarehouseRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create(self, warehouse: Warehouse) -> Warehouse:
+    async def create(self, warehouse: Warehouse) -> Warehouse:
         self.db.add(warehouse)
-        self.db.flush()
-        self.db.refresh(warehouse)
+        await self.db.flush()
+        await self.db.refresh(warehouse)
         return warehouse
 
-    def get(self, warehouse_id: UUID) -> Warehouse | None:
-        return self.db.get(Warehouse, warehouse_id)
+    async def get_for_update(self, tenant_id: UUID, warehouse_id: UUID) -> Warehouse | None:
+        stmt = select(Warehouse).where(Warehouse.tenant_id == tenant_id, Warehouse.id == warehouse_id).with_for_update()
+        return await self.db.scalar(stmt)
 
-    def list(self, limit: int, offset: int) -> list[Warehouse]:
-        return list(self.db.scalars(select(Warehouse).offset(offset).limit(limit).order_by(Warehouse.name)))
+    async def list(self, tenant_id: UUID, limit: int, offset: int = 0, after: str | None = None) -> list[Warehouse]:
+        """Ordered by name, which is unique per tenant; ``after`` seeks past a name instead of using OFFSET."""
+        stmt = select(Warehouse).where(Warehouse.tenant_id == tenant_id).order_by(Warehouse.name)
+        if after is not None:
+            stmt = stmt.where(Warehouse.name > after)
+        elif offset:
+            stmt = stmt.offset(offset)
+        return list(await self.db.scalars(stmt.limit(limit)))
@@ -33,3 +33,36 @@ class BalanceOut(ORMModel):
     product_id: UUID
     warehouse_id: UUID
     qty: float
+
+
+class StockSummaryOut(ORMModel):
+    product_id: UUID
+    sku: str
+    name: str
+    qty: float
+    cost: float
+    value: float
+
+
+class ValuationOut(BaseModel):
+    products: int
+    total_qty: float
+    total_value: float
+
+
+class MovementBatchCreate(BaseModel):
+    items: list[MovementCreate] = Field(min_length=1, max_length=500)
+    all_or_nothing: bool = True
+
+
+class MovementBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    movement: MovementOut | None = None
+    detail: str | None = None
+
+
+class MovementBatchResult(BaseModel):
+    applied: int
+    failed: int
+    results: list[MovementBatchItemResult]
@@ -34,3 +34,16 @@ class ProductOut(ORMModel):
     cost: float
     price: float
     is_active: bool
+
+
+class ProductImportError(BaseModel):
+    row: int
+    sku: str | None = None
+    detail: str
+
+
+class ProductImportResult(BaseModel):
+    inserted: int
+    updated: int
+    failed: int
+    errors: list[ProductImportError]
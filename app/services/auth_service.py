@@ -2,86 +2,106 @@ from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.hashing import hash_password_async, verify_and_update_async
 from app.core.security import (
     create_access_token,
     create_refresh_token,
     decode_token,
-    hash_password,
-    verify_password,
+    hash_refresh_token,
 )
 from app.models import RefreshToken, RoleEnum, Tenant, User, UserTenant
 from app.schemas.auth import LoginRequest, RegisterTenantRequest, TokenResponse
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def register_tenant(self, payload: RegisterTenantRequest) -> TokenResponse:
-        if self.db.scalar(select(Tenant).where(Tenant.slug == payload.slug)):
+    async def register_tenant(self, payload: RegisterTenantRequest) -> TokenResponse:
+        if await self.db.scalar(select(Tenant).where(Tenant.slug == payload.slug)):
             raise HTTPException(status_code=400, detail="Tenant slug already exists")
-        if self.db.scalar(select(User).where(User.email == payload.admin_email)):
+        if await self.db.scalar(select(User).where(User.email == payload.admin_email)):
             raise HTTPException(status_code=400, detail="Email already exists")
+        # End the transaction before hashing so a pending hash does not hold a pooled connection.
+        await self.db.rollback()
+        password_hash = await hash_password_async(payload.password)
 
         tenant = Tenant(name=payload.company_name, slug=payload.slug)
-        user = User(email=payload.admin_email, full_name=payload.admin_name, password_hash=hash_password(payload.password))
+        user = User(email=payload.admin_email, full_name=payload.admin_name, password_hash=password_hash)
         self.db.add_all([tenant, user])
-        self.db.flush()
+        await self.db.flush()
         membership = UserTenant(tenant_id=tenant.id, user_id=user.id, role=RoleEnum.ADMIN, is_default=True)
         self.db.add(membership)
 
-        tokens = self._issue_tokens(user.id, tenant.id, membership.role)
-        self.db.commit()
+        tokens = await self._issue_tokens(user.id, tenant.id, membership.role)
+        await self.db.commit()
         return tokens
 
-    def login(self, payload: LoginRequest) -> TokenResponse:
-        user = self.db.scalar(select(User).where(User.email == payload.email))
-        tenant = self.db.scalar(select(Tenant).where(Tenant.slug == payload.tenant_slug, Tenant.is_active.is_(True)))
-        if not user or not tenant or not verify_password(payload.password, user.password_hash):
+    async def login(self, payload: LoginRequest) -> TokenResponse:
+        user = (await self.db.execute(select(User.id, User.password_hash).where(User.email == payload.email))).first()
+        tenant_id = await self.db.scalar(select(Tenant.id).where(Tenant.slug == payload.tenant_slug, Tenant.is_active.is_(True)))
+        if not user or not tenant_id:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        membership = self.db.scalar(select(UserTenant).where(UserTenant.user_id == user.id, UserTenant.tenant_id == tenant.id))
-        if not membership:
+        # End the transaction before verifying so a pending hash does not hold a pooled connection.
+        await self.db.rollback()
+        valid, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+        if not valid:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        if new_hash:
+            await self.db.execute(update(User).where(User.id == user.id).values(password_hash=new_hash))
+        role = await self.db.scalar(select(UserTenant.role).where(UserTenant.user_id == user.id, UserTenant.tenant_id == tenant_id))
+        if not role:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User has no access to tenant")
-        tokens = self._issue_tokens(user.id, tenant.id, membership.role)
-        self.db.commit()
+        tokens = await self._issue_tokens(user.id, tenant_id, role)
+        await self.db.commit()
         return tokens
 
-    def refresh(self, refresh_token: str) -> TokenResponse:
-        payload = decode_token(refresh_token)
+    async def refresh(self, refresh_token: str) -> TokenResponse:
+        try:
+            payload = decode_token(refresh_token)
+        except ValueError as exc:
+            raise HTTPException(status_code=401, detail="Invalid refresh token") from exc
         if payload.get("type") != "refresh":
             raise HTTPException(status_code=401, detail="Invalid refresh token")
         user_id = UUID(payload["sub"])
         tenant_id = UUID(payload["tenant_id"])
 
-        token_db = self.db.scalar(
-            select(RefreshToken).where(
-                RefreshToken.user_id == user_id,
-                RefreshToken.tenant_id == tenant_id,
-                RefreshToken.revoked.is_(False),
-            )
+        token_db = await self.db.scalar(
+            select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(refresh_token)).with_for_update()
         )
-        if not token_db or not verify_password(refresh_token, token_db.token_hash) or token_db.expires_at < datetime.now(timezone.utc):
+        if not token_db or token_db.user_id != user_id or token_db.tenant_id != tenant_id:
+            raise HTTPException(status_code=401, detail="Refresh token revoked or expired")
+        if token_db.revoked:
+            # A rotated token came back: assume it leaked and end every session of this membership.
+            await self.db.execute(
+                update(RefreshToken)
+                .where(RefreshToken.user_id == user_id, RefreshToken.tenant_id == tenant_id, RefreshToken.revoked.is_(False))
+                .values(revoked=True)
+            )
+            await self.db.commit()
+            raise HTTPException(status_code=401, detail="Refresh token revoked or expired")
+        if token_db.expires_at < datetime.now(timezone.utc):
             raise HTTPException(status_code=401, detail="Refresh token revoked or expired")
         token_db.revoked = True
 
-        membership = self.db.scalar(select(UserTenant).where(UserTenant.user_id == user_id, UserTenant.tenant_id == tenant_id))
+        membership = await self.db.scalar(select(UserTenant).where(UserTenant.user_id == user_id, UserTenant.tenant_id == tenant_id))
         if not membership:
             raise HTTPException(status_code=403, detail="Membership not found")
-        tokens = self._issue_tokens(user_id, tenant_id, membership.role)
-        self.db.commit()
+        tokens = await self._issue_tokens(user_id, tenant_id, membership.role)
+        await self.db.commit()
         return tokens
 
-    def _issue_tokens(self, user_id: UUID, tenant_id: UUID, role: RoleEnum) -> TokenResponse:
+    async def _issue_tokens(self, user_id: UUID, tenant_id: UUID, role: RoleEnum) -> TokenResponse:
         access = create_access_token(user_id, tenant_id, role.value)
         refresh = create_refresh_token(user_id, tenant_id)
         rt = RefreshToken(
             user_id=user_id,
             tenant_id=tenant_id,
-            token_hash=hash_password(refresh),
+            token_hash=hash_refresh_token(refresh),
             expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
         )
         self.db.add(rt)
@@ -1,102 +1,389 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, func, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import InventoryBalance, MovementType, Product, StockMovement, Warehouse
+from app.core.catalog_cache import product_cache, warehouse_cache
+from app.core.export import EXPORT_CHUNK_ROWS
+from app.core.pagination import decode_cursor, paginate
+from app.core.retry import with_retry
+from app.core.versions import BALANCES, mark_changed
+from app.models import (
+    InventoryBalance,
+    MovementType,
+    Product,
+    ProductStockTotal,
+    StockMovement,
+)
 from app.repositories.inventory_repo import InventoryRepository
-from app.schemas.inventory import MovementCreate
+from app.schemas.inventory import (
+    MovementBatchCreate,
+    MovementBatchItemResult,
+    MovementBatchResult,
+    MovementCreate,
+    MovementOut,
+    ValuationOut,
+)
+from app.schemas.product import ProductOut
+from app.schemas.warehouse import WarehouseOut
+from app.services.movement_coalescer import movement_coalescer
+from app.services.snapshot_service import SnapshotService
+
+# ((product_id, warehouse_id), "add" | "remove" | "set", qty)
+BalanceOp = tuple[tuple[UUID, UUID], str, Decimal]
 
 
 class InventoryService:
-    def __init__(self, db: Session, tenant_id: UUID, user_id: UUID):
+    def __init__(self, db: AsyncSession, tenant_id: UUID, user_id: UUID):
         self.db = db
         self.tenant_id = tenant_id
         self.user_id = user_id
         self.repo = InventoryRepository(db)
 
-    def move(self, payload: MovementCreate) -> StockMovement:
-        if payload.idempotency_key:
-            found = self.repo.get_idempotent(self.tenant_id, payload.idempotency_key)
-            if found:
-                return found
+    async def move(self, payload: MovementCreate) -> StockMovement:
+        return await with_retry(self.db, "move", lambda: self._move(payload))
+
+    async def _move(self, payload: MovementCreate) -> StockMovement:
+        ops = self._balance_ops(payload)
+        if payload.type in (MovementType.IN, MovementType.OUT):
+            (((_, warehouse_id), _, _),) = ops
+            if movement_coalescer.handles(payload.product_id, warehouse_id):
+                if payload.idempotency_key:
+                    found = await self.repo.get_idempotent(self.tenant_id, payload.idempotency_key)
+                    if found:
+                        return found
+                await self._check_move_references(payload)
+                # Release this session's connection while the group commit runs on its own.
+                await self.db.commit()
+                movement = self._new_movement(payload)
+                qty = Decimal(str(payload.qty))
+                if await movement_coalescer.submit(movement, warehouse_id, qty if payload.type == MovementType.IN else -qty):
+                    return movement
+
+        # Every check that can fail after a write aborts the request's transaction, so no savepoint is needed.
+        movement = self._new_movement(payload)
+        if payload.idempotency_key and not await self.repo.claim_key(movement):
+            found = await self.repo.get_idempotent(self.tenant_id, payload.idempotency_key)
+            if found is None:
+                raise HTTPException(409, "Concurrent request with the same idempotency_key")
+            return found
+        await self._check_move_references(payload)
+        # Balances are locked in (product, warehouse) order, as in move_batch, so opposing transfers cannot deadlock.
+        for (product_id, warehouse_id), op, qty in sorted(ops, key=lambda entry: entry[0]):
+            if op == "add":
+                await self.repo.add_qty(self.tenant_id, product_id, warehouse_id, qty)
+            elif op == "remove":
+                if await self.repo.remove_qty(self.tenant_id, product_id, warehouse_id, qty) is None:
+                    raise HTTPException(409, "Insufficient stock")
+            else:
+                previous = await self.repo.lock_balance(self.tenant_id, product_id, warehouse_id)
+                await self.repo.set_qty(self.tenant_id, product_id, warehouse_id, qty)
+                movement.adjust_delta = qty - previous
+        await self.repo.add_totals(self.tenant_id, {payload.product_id: self._total_delta(payload, movement.adjust_delta)})
+        await self.repo.add_movement(movement)
+        mark_changed(self.db, self.tenant_id, BALANCES)
+        await self.db.commit()
+        return movement
+
+    async def _check_move_references(self, payload: MovementCreate) -> None:
+        """Answered from the catalog cache when possible, otherwise with one query whose rows fill the cache."""
+        warehouse_ids = {wh for wh in (payload.from_warehouse_id, payload.to_warehouse_id) if wh}
+        cached_product, product_generation = await product_cache.read(self.tenant_id, payload.product_id)
+        cached_warehouses = {wh: await warehouse_cache.read(self.tenant_id, wh) for wh in warehouse_ids}
+        if cached_product is not None and all(value is not None for value, _ in cached_warehouses.values()):
+            return
+        product, warehouses = await self.repo.move_references(self.tenant_id, payload.product_id, warehouse_ids)
+        # Filled with the generations read before the query, so an update that committed in between wins.
+        if product is not None and product_generation is not None:
+            await product_cache.set(self.tenant_id, product.id, ProductOut.model_validate(product), product_generation)
+        for warehouse in warehouses:
+            _, generation = cached_warehouses[warehouse.id]
+            if generation is not None:
+                await warehouse_cache.set(self.tenant_id, warehouse.id, WarehouseOut.model_validate(warehouse), generation)
+        self._check_references(payload, {product.id} if product else set(), {warehouse.id for warehouse in warehouses})
+
+    async def move_batch(self, payload: MovementBatchCreate) -> MovementBatchResult:
+        return await with_retry(self.db, "move_batch", lambda: self._move_batch(payload))
+
+    async def _move_batch(self, payload: MovementBatchCreate) -> MovementBatchResult:
+        items = payload.items
+        results: dict[int, MovementBatchItemResult] = {}
+
+        keys = {item.idempotency_key for item in items if item.idempotency_key}
+        replayed = await self.repo.get_idempotent_many(self.tenant_id, keys) if keys else {}
+        product_ids, warehouse_ids = await self.repo.existing_references(
+            self.tenant_id,
+            {item.product_id for item in items},
+            {wh for item in items for wh in (item.from_warehouse_id, item.to_warehouse_id) if wh},
+        )
+
+        pending: list[tuple[int, MovementCreate, list[BalanceOp]]] = []
+        seen_keys: set[str] = set()
+        for index, item in enumerate(items):
+            key = item.idempotency_key
+            if key in replayed:
+                results[index] = MovementBatchItemResult(index=index, status_code=200, movement=MovementOut.model_validate(replayed[key]))
+                continue
+            try:
+                if key in seen_keys:
+                    raise HTTPException(409, "Duplicate idempotency_key in batch")
+                self._check_references(item, product_ids, warehouse_ids)
+                pending.append((index, item, self._balance_ops(item)))
+            except HTTPException as exc:
+                results[index] = self._failed(index, exc, payload.all_or_nothing)
+                continue
+            if key:
+                seen_keys.add(key)
+
+        created: list[tuple[int, StockMovement]] = []
+        totals: dict[UUID, Decimal] = {}
+        if pending:
+            balances = await self.repo.lock_balances(self.tenant_id, {pair for _, _, ops in pending for pair, _, _ in ops})
+            for index, item, ops in pending:
+                try:
+                    staged = self._apply_ops(balances, ops)
+                except HTTPException as exc:
+                    results[index] = self._failed(index, exc, payload.all_or_nothing)
+                    continue
+                adjust_delta = None
+                if item.type == MovementType.ADJUST:
+                    ((pair, qty),) = staged.items()
+                    adjust_delta = qty - Decimal(str(balances[pair].qty))
+                for pair, qty in staged.items():
+                    balances[pair].qty = qty
+                created.append((index, self._new_movement(item, adjust_delta)))
+                totals[item.product_id] = totals.get(item.product_id, Decimal(0)) + self._total_delta(item, adjust_delta)
+            try:
+                await self.repo.add_totals(self.tenant_id, totals)
+                await self.repo.add_movements([movement for _, movement in created])
+                mark_changed(self.db, self.tenant_id, BALANCES)
+                await self.db.commit()
+            except IntegrityError:
+                await self.db.rollback()
+                raise HTTPException(409, "Concurrent request with the same idempotency_key")
+
+        for index, movement in created:
+            results[index] = MovementBatchItemResult(index=index, status_code=200, movement=MovementOut.model_validate(movement))
+        failed = sum(1 for result in results.values() if result.status_code != 200)
+        return MovementBatchResult(applied=len(items) - failed, failed=failed, results=[results[i] for i in range(len(items))])
 
-        product = self.db.get(Product, payload.product_id)
-        if not product:
+    @staticmethod
+    def _failed(index: int, exc: HTTPException, all_or_nothing: bool) -> MovementBatchItemResult:
+        if all_or_nothing:
+            raise HTTPException(exc.status_code, {"index": index, "detail": exc.detail})
+        return MovementBatchItemResult(index=index, status_code=exc.status_code, detail=exc.detail)
+
+    @staticmethod
+    def _check_references(item: MovementCreate, product_ids: set[UUID], warehouse_ids: set[UUID]) -> None:
+        if item.product_id not in product_ids:
             raise HTTPException(404, "Product not found")
-        if payload.from_warehouse_id and not self.db.get(Warehouse, payload.from_warehouse_id):
+        if item.from_warehouse_id and item.from_warehouse_id not in warehouse_ids:
             raise HTTPException(404, "from_warehouse not found")
-        if payload.to_warehouse_id and not self.db.get(Warehouse, payload.to_warehouse_id):
+        if item.to_warehouse_id and item.to_warehouse_id not in warehouse_ids:
             raise HTTPException(404, "to_warehouse not found")
 
-        qty = Decimal(str(payload.qty))
-        with self.db.begin_nested():
-            if payload.type == MovementType.IN:
-                self._add(payload.product_id, payload.to_warehouse_id, qty)
-            elif payload.type == MovementType.OUT:
-                self._remove(payload.product_id, payload.from_warehouse_id, qty)
-            elif payload.type == MovementType.TRANSFER:
-                if payload.from_warehouse_id == payload.to_warehouse_id:
-                    raise HTTPException(400, "Warehouses must be different")
-                self._remove(payload.product_id, payload.from_warehouse_id, qty)
-                self._add(payload.product_id, payload.to_warehouse_id, qty)
-            elif payload.type == MovementType.ADJUST:
-                if payload.adjust_to_quantity is None:
-                    raise HTTPException(400, "adjust_to_quantity is required for ADJUST")
-                self._set_qty(payload.product_id, payload.to_warehouse_id or payload.from_warehouse_id, Decimal(str(payload.adjust_to_quantity)))
-
-            movement = StockMovement(
-                tenant_id=self.tenant_id,
-                type=payload.type,
-                qty=qty,
-                product_id=payload.product_id,
-                from_warehouse_id=payload.from_warehouse_id,
-                to_warehouse_id=payload.to_warehouse_id,
-                reference=payload.reference,
-                idempotency_key=payload.idempotency_key,
-                created_by=self.user_id,
+    @staticmethod
+    def _balance_ops(item: MovementCreate) -> list[BalanceOp]:
+        qty = Decimal(str(item.qty))
+        if item.type == MovementType.IN:
+            targets = [(item.to_warehouse_id, "add", qty)]
+        elif item.type == MovementType.OUT:
+            targets = [(item.from_warehouse_id, "remove", qty)]
+        elif item.type == MovementType.TRANSFER:
+            if item.from_warehouse_id == item.to_warehouse_id:
+                raise HTTPException(400, "Warehouses must be different")
+            targets = [(item.from_warehouse_id, "remove", qty), (item.to_warehouse_id, "add", qty)]
+        else:
+            if item.adjust_to_quantity is None:
+                raise HTTPException(400, "adjust_to_quantity is required for ADJUST")
+            targets = [(item.to_warehouse_id or item.from_warehouse_id, "set", Decimal(str(item.adjust_to_quantity)))]
+        if any(warehouse_id is None for warehouse_id, _, _ in targets):
+            raise HTTPException(400, "Warehouse required")
+        return [((item.product_id, warehouse_id), op, value) for warehouse_id, op, value in targets]
+
+    @staticmethod
+    def _apply_ops(balances: dict[tuple[UUID, UUID], InventoryBalance], ops: list[BalanceOp]) -> dict[tuple[UUID, UUID], Decimal]:
+        staged: dict[tuple[UUID, UUID], Decimal] = {}
+        for pair, op, qty in ops:
+            current = staged.get(pair, Decimal(str(balances[pair].qty)))
+            if op == "add":
+                staged[pair] = current + qty
+            elif op == "remove":
+                if current - qty < 0:
+                    raise HTTPException(409, "Insufficient stock")
+                staged[pair] = current - qty
+            else:
+                staged[pair] = qty
+        return staged
+
+    @staticmethod
+    def _total_delta(item: MovementCreate, adjust_delta: Decimal | None) -> Decimal:
+        """Change in the product's on-hand quantity across all warehouses."""
+        if item.type == MovementType.IN:
+            return Decimal(str(item.qty))
+        if item.type == MovementType.OUT:
+            return -Decimal(str(item.qty))
+        if item.type == MovementType.ADJUST:
+            return adjust_delta
+        return Decimal(0)
+
+    def _new_movement(self, payload: MovementCreate, adjust_delta: Decimal | None = None) -> StockMovement:
+        return StockMovement(
+            tenant_id=self.tenant_id,
+            type=payload.type,
+            qty=Decimal(str(payload.qty)),
+            product_id=payload.product_id,
+            from_warehouse_id=payload.from_warehouse_id,
+            to_warehouse_id=payload.to_warehouse_id,
+            reference=payload.reference,
+            idempotency_key=payload.idempotency_key,
+            adjust_delta=adjust_delta,
+            created_by=self.user_id,
+        )
+
+    async def balances(
+        self,
+        limit: int,
+        offset: int = 0,
+        cursor: str | None = None,
+        as_of: datetime | None = None,
+        product_id: UUID | None = None,
+        warehouse_id: UUID | None = None,
+    ) -> tuple[list[Row], str | None]:
+        if as_of is None:
+            source = (
+                select(InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.qty)
+                .where(InventoryBalance.tenant_id == self.tenant_id)
+                .subquery()
             )
-            self.repo.add_movement(movement)
-        self.db.commit()
-        return movement
+        else:
+            source = await SnapshotService(self.db, self.tenant_id).balances_as_of(as_of, product_id)
+        stmt = select(source).order_by(source.c.product_id, source.c.warehouse_id)
+        if product_id:
+            stmt = stmt.where(source.c.product_id == product_id)
+        if warehouse_id:
+            stmt = stmt.where(source.c.warehouse_id == warehouse_id)
+        if cursor:
+            stmt = stmt.where(tuple_(source.c.product_id, source.c.warehouse_id) > decode_cursor(cursor, UUID, UUID))
+        elif offset:
+            stmt = stmt.offset(offset)
+        rows = (await self.db.execute(stmt.limit(limit + 1))).all()
+        return paginate(rows, limit, lambda b: (b.product_id, b.warehouse_id))
 
-    def _get_or_create_locked_balance(self, product_id: UUID, warehouse_id: UUID) -> InventoryBalance:
-        if warehouse_id is None:
-            raise HTTPException(400, "Warehouse required")
-        balance = self.repo.get_balance_for_update(self.tenant_id, product_id, warehouse_id)
-        if not balance:
-            balance = self.repo.create_balance(self.tenant_id, product_id, warehouse_id)
-            self.db.flush()
-            balance = self.repo.get_balance_for_update(self.tenant_id, product_id, warehouse_id)
-        return balance
-
-    def _add(self, product_id: UUID, warehouse_id: UUID | None, qty: Decimal) -> None:
-        balance = self._get_or_create_locked_balance(product_id, warehouse_id)
-        balance.qty = Decimal(str(balance.qty)) + qty
-
-    def _remove(self, product_id: UUID, warehouse_id: UUID | None, qty: Decimal) -> None:
-        balance = self._get_or_create_locked_balance(product_id, warehouse_id)
-        current = Decimal(str(balance.qty))
-        if current - qty < 0:
-            raise HTTPException(409, "Insufficient stock")
-        balance.qty = current - qty
-
-    def _set_qty(self, product_id: UUID, warehouse_id: UUID | None, qty: Decimal) -> None:
-        balance = self._get_or_create_locked_balance(product_id, warehouse_id)
-        balance.qty = qty
-
-    def balances(self, limit: int, offset: int):
-        stmt = select(InventoryBalance).offset(offset).limit(limit).order_by(InventoryBalance.product_id)
-        return list(self.db.scalars(stmt))
-
-    def kardex(self, product_id: UUID, limit: int, offset: int):
+    async def summary(
+        self, limit: int, offset: int = 0, cursor: str | None = None, product_id: UUID | None = None
+    ) -> tuple[list[Row], str | None]:
+        """On-hand quantity and value per product, one row each regardless of warehouse count."""
+        stmt = (
+            select(
+                ProductStockTotal.product_id,
+                Product.sku,
+                Product.name,
+                ProductStockTotal.qty,
+                Product.cost,
+                (ProductStockTotal.qty * Product.cost).label("value"),
+            )
+            .join(Product, Product.id == ProductStockTotal.product_id)
+            .where(ProductStockTotal.tenant_id == self.tenant_id)
+            .order_by(ProductStockTotal.product_id)
+        )
+        if product_id:
+            stmt = stmt.where(ProductStockTotal.product_id == product_id)
+        if cursor:
+            (after,) = decode_cursor(cursor, UUID)
+            stmt = stmt.where(ProductStockTotal.product_id > after)
+        elif offset:
+            stmt = stmt.offset(offset)
+        rows = (await self.db.execute(stmt.limit(limit + 1))).all()
+        return paginate(rows, limit, lambda row: (row.product_id,))
+
+    async def valuation(self) -> ValuationOut:
+        stmt = (
+            select(
+                func.count(),
+                func.coalesce(func.sum(ProductStockTotal.qty), 0),
+                func.coalesce(func.sum(ProductStockTotal.qty * Product.cost), 0),
+            )
+            .join(Product, Product.id == ProductStockTotal.product_id)
+            .where(ProductStockTotal.tenant_id == self.tenant_id, ProductStockTotal.qty != 0)
+        )
+        products, total_qty, total_value = (await self.db.execute(stmt)).one()
+        return ValuationOut(products=products, total_qty=total_qty, total_value=total_value)
+
+    async def kardex(
+        self,
+        product_id: UUID,
+        limit: int,
+        offset: int = 0,
+        cursor: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+    ) -> tuple[list[StockMovement], str | None]:
         stmt = (
             select(StockMovement)
-            .where(StockMovement.product_id == product_id)
-            .order_by(StockMovement.created_at.desc())
-            .offset(offset)
-            .limit(limit)
+            .where(StockMovement.tenant_id == self.tenant_id, StockMovement.product_id == product_id)
+            .order_by(StockMovement.created_at.desc(), StockMovement.id.desc())
+        )
+        # Plain created_at bounds (not just the row comparison) let the planner prune partitions.
+        if date_from:
+            stmt = stmt.where(StockMovement.created_at >= date_from)
+        if date_to:
+            stmt = stmt.where(StockMovement.created_at < date_to)
+        if cursor:
+            created_at, movement_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+            stmt = stmt.where(StockMovement.created_at <= created_at, tuple_(StockMovement.created_at, StockMovement.id) < (created_at, movement_id))
+        elif offset:
+            stmt = stmt.offset(offset)
+        rows = list(await self.db.scalars(stmt.limit(limit + 1)))
+        return paginate(rows, limit, lambda m: (m.created_at, m.id))
+
+    async def stream_kardex(
+        self,
+        product_id: UUID | None = None,
+        warehouse_id: UUID | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+    ) -> AsyncIterator[Row]:
+        """Yield ledger rows oldest first from a server-side cursor."""
+        stmt = (
+            select(
+                StockMovement.id,
+                StockMovement.type,
+                StockMovement.qty,
+                StockMovement.product_id,
+                StockMovement.from_warehouse_id,
+                StockMovement.to_warehouse_id,
+                StockMovement.reference,
+                StockMovement.created_at,
+            )
+            .where(StockMovement.tenant_id == self.tenant_id)
+            .order_by(StockMovement.created_at, StockMovement.id)
+        )
+        if product_id:
+            stmt = stmt.where(StockMovement.product_id == product_id)
+        if warehouse_id:
+            stmt = stmt.where(or_(StockMovement.from_warehouse_id == warehouse_id, StockMovement.to_warehouse_id == warehouse_id))
+        if date_from:
+            stmt = stmt.where(StockMovement.created_at >= date_from)
+        if date_to:
+            stmt = stmt.where(StockMovement.created_at < date_to)
+        result = await self.db.stream(stmt, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+        async for row in result:
+            yield row
+
+    async def stream_balances(self, warehouse_id: UUID | None = None) -> AsyncIterator[Row]:
+        stmt = (
+            select(InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.qty)
+            .where(InventoryBalance.tenant_id == self.tenant_id)
+            .order_by(InventoryBalance.product_id, InventoryBalance.warehouse_id)
         )
-        return list(self.db.scalars(stmt))
+        if warehouse_id:
+            stmt = stmt.where(InventoryBalance.warehouse_id == warehouse_id)
+        result = await self.db.stream(stmt, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+        async for row in result:
+            yield row
@@ -0,0 +1,122 @@
+"""Group commit for movements on hot (product, warehouse) pairs.
+
+IN/OUT movements on pairs listed in HOT_SKU_PAIRS are queued for
+HOT_SKU_WINDOW_MS and applied together: one balance lock, one balance update
+and one multi-row ledger insert per group, instead of one transaction per
+request queuing on the same row lock. Movements are netted in arrival order, so
+each caller still gets its own ``StockMovement`` or its own insufficient-stock
+error. Coalescing is per process; other workers still serialize on the row lock.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.tenant import WRITE_TIMEOUTS, set_tenant_context
+from app.core.versions import BALANCES, mark_changed
+from app.models import StockMovement
+from app.repositories.inventory_repo import InventoryRepository
+
+logger = logging.getLogger(__name__)
+
+# (tenant_id, product_id, warehouse_id)
+GroupKey = tuple[UUID, UUID, UUID]
+
+
+@dataclass
+class _Pending:
+    movement: StockMovement
+    delta: Decimal
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class MovementCoalescer:
+    def __init__(
+        self,
+        pairs: set[tuple[UUID, UUID]],
+        session_factory: async_sessionmaker[AsyncSession] = SessionLocal,
+        window_ms: float = settings.hot_sku_window_ms,
+        max_batch: int = settings.hot_sku_max_batch,
+    ):
+        self.pairs = pairs
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: dict[GroupKey, list[_Pending]] = {}
+        self._drainers: dict[GroupKey, asyncio.Task] = {}
+
+    def handles(self, product_id: UUID, warehouse_id: UUID | None) -> bool:
+        return (product_id, warehouse_id) in self.pairs
+
+    async def submit(self, movement: StockMovement, warehouse_id: UUID, delta: Decimal) -> bool:
+        """Queue a movement changing ``warehouse_id`` by ``delta``.
+
+        Returns True once it is committed and False if the group failed, in which
+        case the caller should apply it on its own. Raises 409 on insufficient stock.
+        """
+        key = (movement.tenant_id, movement.product_id, warehouse_id)
+        pending = _Pending(movement, delta)
+        self._pending.setdefault(key, []).append(pending)
+        if key not in self._drainers:
+            self._drainers[key] = asyncio.create_task(self._drain(key))
+        return await pending.future
+
+    async def _drain(self, key: GroupKey) -> None:
+        # One group per key in flight: the next one fills up while this one commits.
+        try:
+            while self._pending.get(key):
+                await asyncio.sleep(self.window)
+                queued = self._pending.pop(key)
+                group, rest = queued[: self.max_batch], queued[self.max_batch :]
+                if rest:
+                    self._pending[key] = rest
+                await self._apply(key, group)
+        finally:
+            del self._drainers[key]
+
+    async def _apply(self, key: GroupKey, group: list[_Pending]) -> None:
+        tenant_id, product_id, warehouse_id = key
+        accepted: list[_Pending] = []
+        rejected: list[_Pending] = []
+        try:
+            async with self.session_factory() as db:
+                await set_tenant_context(db, tenant_id, timeouts=WRITE_TIMEOUTS)
+                repo = InventoryRepository(db)
+                qty = await repo.lock_balance(tenant_id, product_id, warehouse_id)
+                for pending in group:
+                    if pending.future.done():
+                        continue
+                    if qty + pending.delta < 0:
+                        rejected.append(pending)
+                        continue
+                    qty += pending.delta
+                    accepted.append(pending)
+                if accepted:
+                    await repo.set_qty(tenant_id, product_id, warehouse_id, qty)
+                    await repo.add_totals(tenant_id, {product_id: sum(pending.delta for pending in accepted)})
+                    await repo.add_movements([pending.movement for pending in accepted])
+                    mark_changed(db, tenant_id, BALANCES)
+                    await db.commit()
+        except Exception:
+            logger.exception("hot SKU group commit failed; applying %s movements individually", len(group))
+            for pending in group:
+                if not pending.future.done():
+                    pending.future.set_result(False)
+            return
+        # Rejections are only final once the movements netted before them are committed.
+        for pending in rejected:
+            if not pending.future.done():
+                pending.future.set_exception(HTTPException(409, "Insufficient stock"))
+        for pending in accepted:
+            if not pending.future.done():
+                pending.future.set_result(True)
+
+
+movement_coalescer = MovementCoalescer(set(settings.hot_sku_pairs))
@@ -1,39 +1,111 @@
+import asyncio
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+from typing import BinaryIO
 from uuid import UUID
 
 from fastapi import HTTPException
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.catalog_cache import product_cache
+from app.core.export import DataFormat
+from app.core.pagination import decode_cursor, paginate
+from app.core.versions import PRODUCTS, mark_changed
 from app.models import Product
 from app.repositories.product_repo import ProductRepository
-from app.schemas.product import ProductCreate, ProductUpdate
+from app.schemas.product import ProductCreate, ProductImportError, ProductImportResult, ProductUpdate
 
 
 class ProductService:
-    def __init__(self, db: Session, tenant_id: UUID):
+    def __init__(self, db: AsyncSession, tenant_id: UUID):
         self.db = db
         self.tenant_id = tenant_id
         self.repo = ProductRepository(db)
 
-    def create(self, payload: ProductCreate) -> Product:
+    async def create(self, payload: ProductCreate) -> Product:
         product = Product(tenant_id=self.tenant_id, **payload.model_dump())
         try:
-            self.repo.create(product)
-            self.db.commit()
+            await self.repo.create(product)
+            mark_changed(self.db, self.tenant_id, PRODUCTS)
+            await self.db.commit()
         except IntegrityError:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(status_code=400, detail="Duplicate sku or invalid relation")
         return product
 
-    def list(self, limit: int, offset: int) -> list[Product]:
-        return self.repo.list(limit, offset)
+    async def import_catalog(self, source: BinaryIO, data_format: DataFormat) -> ProductImportResult:
+        rows, errors = await asyncio.to_thread(_parse_catalog, source, data_format)
+        category_ids = {product.category_id for _, product in rows if product.category_id}
+        if category_ids:
+            known = await self.repo.existing_category_ids(self.tenant_id, category_ids)
+            for number, product in rows:
+                if product.category_id and product.category_id not in known:
+                    errors.append(ProductImportError(row=number, sku=product.sku, detail="Category not found"))
+            rows = [(number, product) for number, product in rows if not product.category_id or product.category_id in known]
 
-    def update(self, product_id: UUID, payload: ProductUpdate) -> Product:
-        product = self.repo.get(product_id)
+        inserted = updated = 0
+        if rows:
+            records = [
+                (p.sku, p.name, p.description, p.unit, Decimal(str(p.cost)), Decimal(str(p.price)), p.category_id) for _, p in rows
+            ]
+            inserted, updated = await self.repo.bulk_upsert(self.tenant_id, records)
+            mark_changed(self.db, self.tenant_id, PRODUCTS)
+            await self.db.commit()
+            # Updated rows are matched by sku, so drop the tenant's whole product namespace.
+            await product_cache.invalidate(self.tenant_id)
+        errors.sort(key=lambda error: error.row)
+        return ProductImportResult(inserted=inserted, updated=updated, failed=len(errors), errors=errors)
+
+    async def search(self, query: str, limit: int, cursor: str | None = None) -> tuple[list[Product], str | None]:
+        after = decode_cursor(cursor, float, UUID) if cursor else None
+        rows = await self.repo.search(self.tenant_id, query, limit + 1, after)
+        page, next_cursor = paginate(rows, limit, lambda row: (row.score, row.Product.id))
+        return [row.Product for row in page], next_cursor
+
+    async def list(self, limit: int, offset: int = 0, cursor: str | None = None) -> tuple[list[Product], str | None]:
+        after = decode_cursor(cursor, datetime.fromisoformat, UUID) if cursor else None
+        rows = await self.repo.list(self.tenant_id, limit + 1, offset, after)
+        return paginate(rows, limit, lambda p: (p.created_at, p.id))
+
+    async def update(self, product_id: UUID, payload: ProductUpdate) -> Product:
+        product = await self.repo.get_for_update(self.tenant_id, product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         for key, value in payload.model_dump(exclude_unset=True).items():
             setattr(product, key, value)
-        self.db.commit()
-        self.db.refresh(product)
+        mark_changed(self.db, self.tenant_id, PRODUCTS)
+        await self.db.commit()
+        await product_cache.invalidate(self.tenant_id, product_id)
+        await self.db.refresh(product)
         return product
+
+
+def _parse_catalog(source: BinaryIO, data_format: DataFormat) -> tuple[list[tuple[int, ProductCreate]], list[ProductImportError]]:
+    """Validate every row of an uploaded catalog; returns (valid rows, errors) keyed by 1-based row number."""
+    stream = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    if data_format == DataFormat.CSV:
+        raw_rows = ({key: value for key, value in row.items() if value not in ("", None)} for row in csv.DictReader(stream))
+    else:
+        raw_rows = (line for line in stream if line.strip())
+
+    rows: list[tuple[int, ProductCreate]] = []
+    errors: list[ProductImportError] = []
+    seen: set[str] = set()
+    for number, raw in enumerate(raw_rows, start=1):
+        try:
+            product = ProductCreate.model_validate_json(raw) if isinstance(raw, str) else ProductCreate.model_validate(raw)
+        except ValidationError as exc:
+            detail = "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in exc.errors())
+            errors.append(ProductImportError(row=number, sku=raw.get("sku") if isinstance(raw, dict) else None, detail=detail))
+            continue
+        if product.sku in seen:
+            errors.append(ProductImportError(row=number, sku=product.sku, detail="Duplicate sku in file"))
+            continue
+        seen.add(product.sku)
+        rows.append((number, product))
+    stream.detach()
+    return rows, errors
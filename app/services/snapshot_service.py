@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import DateTime, Subquery, delete, func, insert, literal, select, union_all
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InventoryBalance, StockSnapshot
+from app.repositories.inventory_repo import ledger_effects
+
+
+class SnapshotService:
+    def __init__(self, db: AsyncSession, tenant_id: UUID):
+        self.db = db
+        self.tenant_id = tenant_id
+
+    async def take(self, taken_at: datetime) -> int:
+        """Write the tenant's balances as of ``taken_at``; returns the number of rows.
+
+        Computed backwards from the current balances minus the movements since
+        ``taken_at``, so the cost is bounded by that tail rather than the whole
+        ledger. Run it under REPEATABLE READ so balances and ledger agree. Taking
+        the same ``taken_at`` twice replaces the earlier snapshot.
+        """
+        if taken_at > datetime.now(timezone.utc):
+            raise ValueError("Snapshots cannot be taken in the future")
+        since = ledger_effects(self.tenant_id, since=taken_at).subquery()
+        rows = union_all(
+            select(InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.qty).where(
+                InventoryBalance.tenant_id == self.tenant_id
+            ),
+            select(since.c.product_id, since.c.warehouse_id, -since.c.qty),
+        ).subquery()
+        await self.db.execute(delete(StockSnapshot).where(StockSnapshot.tenant_id == self.tenant_id, StockSnapshot.taken_at == taken_at))
+        result = await self.db.execute(
+            insert(StockSnapshot).from_select(
+                ["id", "tenant_id", "taken_at", "product_id", "warehouse_id", "qty"],
+                select(
+                    func.gen_random_uuid(),
+                    literal(self.tenant_id, PG_UUID(as_uuid=True)),
+                    literal(taken_at, DateTime(timezone=True)),
+                    rows.c.product_id,
+                    rows.c.warehouse_id,
+                    func.sum(rows.c.qty),
+                )
+                .group_by(rows.c.product_id, rows.c.warehouse_id)
+                .having(func.sum(rows.c.qty) != 0),
+            )
+        )
+        return result.rowcount
+
+    async def balances_as_of(self, as_of: datetime, product_id: UUID | None = None) -> Subquery:
+        """(product_id, warehouse_id, qty) at ``as_of``: the latest snapshot before it plus the movements after that."""
+        taken_at = await self.db.scalar(
+            select(func.max(StockSnapshot.taken_at)).where(StockSnapshot.tenant_id == self.tenant_id, StockSnapshot.taken_at <= as_of)
+        )
+        parts = list(ledger_effects(self.tenant_id, since=taken_at, until=as_of, product_id=product_id).selects)
+        if taken_at is not None:
+            snapshot = select(StockSnapshot.product_id, StockSnapshot.warehouse_id, StockSnapshot.qty).where(
+                StockSnapshot.tenant_id == self.tenant_id, StockSnapshot.taken_at == taken_at
+            )
+            if product_id is not None:
+                snapshot = snapshot.where(StockSnapshot.product_id == product_id)
+            parts.append(snapshot)
+        rows = union_all(*parts).subquery()
+        return (
+            select(rows.c.product_id, rows.c.warehouse_id, func.sum(rows.c.qty).label("qty"))
+            .group_by(rows.c.product_id, rows.c.warehouse_id)
+            .having(func.sum(rows.c.qty) != 0)
+            .subquery()
+        )
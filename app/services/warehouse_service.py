@@ -2,38 +2,46 @@ from uuid import UUID
 
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.catalog_cache import warehouse_cache
+from app.core.pagination import decode_cursor, paginate
+from app.core.versions import WAREHOUSES, mark_changed
 from app.models import Warehouse
 from app.repositories.warehouse_repo import WarehouseRepository
 from app.schemas.warehouse import WarehouseCreate, WarehouseUpdate
 
 
 class WarehouseService:
-    def __init__(self, db: Session, tenant_id: UUID):
+    def __init__(self, db: AsyncSession, tenant_id: UUID):
         self.db = db
         self.tenant_id = tenant_id
         self.repo = WarehouseRepository(db)
 
-    def create(self, payload: WarehouseCreate) -> Warehouse:
+    async def create(self, payload: WarehouseCreate) -> Warehouse:
         warehouse = Warehouse(tenant_id=self.tenant_id, **payload.model_dump())
         try:
-            self.repo.create(warehouse)
-            self.db.commit()
+            await self.repo.create(warehouse)
+            mark_changed(self.db, self.tenant_id, WAREHOUSES)
+            await self.db.commit()
         except IntegrityError:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(status_code=400, detail="Warehouse already exists")
         return warehouse
 
-    def list(self, limit: int, offset: int) -> list[Warehouse]:
-        return self.repo.list(limit, offset)
+    async def list(self, limit: int, offset: int = 0, cursor: str | None = None) -> tuple[list[Warehouse], str | None]:
+        after = decode_cursor(cursor, str)[0] if cursor else None
+        rows = await self.repo.list(self.tenant_id, limit + 1, offset, after)
+        return paginate(rows, limit, lambda w: (w.name,))
 
-    def update(self, warehouse_id: UUID, payload: WarehouseUpdate) -> Warehouse:
-        warehouse = self.repo.get(warehouse_id)
+    async def update(self, warehouse_id: UUID, payload: WarehouseUpdate) -> Warehouse:
+        warehouse = await self.repo.get_for_update(self.tenant_id, warehouse_id)
         if not warehouse:
             raise HTTPException(status_code=404, detail="Warehouse not found")
         for key, value in payload.model_dump(exclude_unset=True).items():
             setattr(warehouse, key, value)
-        self.db.commit()
-        self.db.refresh(warehouse)
+        mark_changed(self.db, self.tenant_id, WAREHOUSES)
+        await self.db.commit()
+        await warehouse_cache.invalidate(self.tenant_id, warehouse_id)
+        await self.db.refresh(warehouse)
         return warehouse
@@ -0,0 +1,26 @@
+pytest_plugins = ["app.tests.query_budget"]
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+
+@pytest.fixture(scope="session")
+def db_ready():
+    engine = create_engine(settings.database_url)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        pytest.skip("PostgreSQL no disponible para pruebas de integración")
+    return True
+
+
+@pytest.fixture(scope="session")
+def trgm_ready(db_ready):
+    engine = create_engine(settings.database_url)
+    with engine.connect() as conn:
+        if not conn.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+            pytest.skip("pg_trgm no instalado (correr alembic upgrade head)")
+    return True
@@ -0,0 +1,25 @@
+"""Pytest plugin: every request made in a test is held to its endpoint's ``query_budget``."""
+
+import pytest
+
+from app.core import query_budget
+from app.core.db import engine
+from app.main import app
+
+
+def pytest_configure(config):
+    query_budget.install(engine.sync_engine)
+    app.add_middleware(query_budget.QueryBudgetMiddleware)
+
+
+@pytest.fixture
+def request_statements():
+    """Statements of each request made during the test, as (method, path, StatementLog) in order."""
+    seen = []
+
+    def hook(scope, log):
+        seen.append((scope["method"], scope["path"], log))
+
+    query_budget.request_hooks.append(hook)
+    yield seen
+    query_budget.request_hooks.remove(hook)
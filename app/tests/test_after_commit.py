@@ -0,0 +1,36 @@
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.after_commit import CommitSession
+from app.core.config import settings
+from app.core.versions import PRODUCTS, current_version, mark_changed
+
+
+def test_versions_are_bumped_after_commit_and_not_on_rollback(db_ready):
+    tenant_id = uuid4()
+
+    async def run():
+        engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+        sessions = async_sessionmaker(engine, class_=CommitSession)
+        try:
+            versions = [await current_version(tenant_id, PRODUCTS)]
+            async with sessions() as db:
+                await db.execute(text("SELECT 1"))
+                mark_changed(db, tenant_id, PRODUCTS)
+                await db.rollback()
+                versions.append(await current_version(tenant_id, PRODUCTS))
+
+                await db.execute(text("SELECT 1"))
+                mark_changed(db, tenant_id, PRODUCTS)
+                await db.commit()
+                versions.append(await current_version(tenant_id, PRODUCTS))
+            return versions
+        finally:
+            await engine.dispose()
+
+    initial, after_rollback, after_commit = asyncio.run(run())
+    assert initial == after_rollback != after_commit
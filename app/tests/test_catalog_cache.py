@@ -0,0 +1,52 @@
+import asyncio
+from uuid import uuid4
+
+from app.core import catalog_cache
+from app.core.catalog_cache import CatalogCache
+from app.schemas.warehouse import WarehouseOut
+
+
+def test_catalog_cache_fills_and_bounds_each_tenant(monkeypatch):
+    monkeypatch.setattr(catalog_cache, "get_async_redis", lambda: None)
+    cache = CatalogCache("warehouses", WarehouseOut, ttl_seconds=60, max_entries_per_tenant=2)
+    tenant_a, tenant_b = uuid4(), uuid4()
+    loads = []
+
+    async def get(tenant_id, warehouse_id):
+        value, generation = await cache.read(tenant_id, warehouse_id)
+        if value is None:
+            loads.append(warehouse_id)
+            value = WarehouseOut(id=warehouse_id, name="W", address=None, is_active=True)
+            await cache.set(tenant_id, warehouse_id, value, generation)
+        return value
+
+    first, second, third = uuid4(), uuid4(), uuid4()
+    asyncio.run(get(tenant_a, first))
+    assert asyncio.run(get(tenant_a, first)).id == first
+    assert loads == [first]
+    assert asyncio.run(cache.get(tenant_b, first)) is None
+
+    asyncio.run(get(tenant_a, second))
+    asyncio.run(get(tenant_a, third))
+    assert asyncio.run(cache.get(tenant_a, first)) is None
+
+    asyncio.run(cache.invalidate(tenant_a, third))
+    assert asyncio.run(cache.get(tenant_a, third)) is None
+    asyncio.run(cache.invalidate(tenant_a))
+    assert asyncio.run(cache.get(tenant_a, second)) is None
+
+
+def test_fill_loaded_before_an_invalidation_is_dropped():
+    # Runs against Redis when REDIS_URL is set, in memory otherwise.
+    cache = CatalogCache("warehouses", WarehouseOut, ttl_seconds=60, max_entries_per_tenant=10)
+    tenant_id, warehouse_id = uuid4(), uuid4()
+
+    async def run():
+        _, generation = await cache.read(tenant_id, warehouse_id)
+        stale = WarehouseOut(id=warehouse_id, name="old", address=None, is_active=True)
+        # The row was loaded with the old generation; an update commits and invalidates before the fill.
+        await cache.invalidate(tenant_id, warehouse_id)
+        await cache.set(tenant_id, warehouse_id, stale, generation)
+        return await cache.get(tenant_id, warehouse_id)
+
+    assert asyncio.run(run()) is None
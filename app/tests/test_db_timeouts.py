@@ -0,0 +1,52 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.db import SessionLocal, engine
+from app.core.tenant import Timeouts, set_tenant_context
+from app.main import app, create_app
+
+
+class _Canceled(Exception):
+    sqlstate = "57014"
+
+
+def test_statement_timeouts_answer_503():
+    api = create_app()
+
+    @api.get("/slow")
+    async def slow():
+        raise DBAPIError("SELECT pg_sleep(60)", {}, _Canceled())
+
+    with TestClient(api) as client:
+        response = client.get("/slow")
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+
+
+def test_tenant_timeouts_are_applied_per_transaction(db_ready):
+    async def run():
+        async with SessionLocal() as db:
+            await set_tenant_context(db, uuid4(), timeouts=Timeouts(statement_ms=200, lock_ms=50))
+            current = (await db.execute(text("SELECT current_setting('statement_timeout'), current_setting('lock_timeout')"))).one()
+            with pytest.raises(DBAPIError) as exc:
+                await db.execute(text("SELECT pg_sleep(1)"))
+            await db.rollback()
+            # The next transaction gets the same limits again.
+            again = await db.scalar(text("SELECT current_setting('statement_timeout')"))
+        await engine.dispose()
+        return current, exc.value.orig.sqlstate, again
+
+    current, sqlstate, again = asyncio.run(run())
+    assert tuple(current) == ("200ms", "50ms")
+    assert sqlstate == "57014" and again == "200ms"
+
+
+def test_ready_reports_pool_usage(db_ready):
+    with TestClient(app) as client:
+        body = client.get("/ready").json()
+    assert body["status"] == "ready" and body["database"] == "ok"
+    assert body["pool"]["capacity"] >= body["pool"]["checked_out"]
@@ -0,0 +1,51 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import hashing
+from app.core.db import engine
+from app.core.security import pwd_context
+from app.main import app
+from app.services import auth_service
+
+
+def test_outdated_hash_is_replaced_on_verify():
+    legacy = pwd_context.handler("argon2").using(memory_cost=1024).hash("SuperSecret123")
+    try:
+        valid, new_hash = asyncio.run(hashing.verify_and_update_async("SuperSecret123", legacy))
+    finally:
+        hashing.shutdown_hash_pool()
+    assert valid
+    assert f"m={hashing.settings.password_hash_memory_cost}," in new_hash
+
+
+def test_hashing_sheds_load_beyond_max_pending(monkeypatch):
+    monkeypatch.setattr(hashing.settings, "password_hash_max_pending", 0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(hashing.hash_password_async("SuperSecret123"))
+    assert exc.value.status_code == 429
+
+
+def test_auth_hashes_without_holding_a_pooled_connection(db_ready, monkeypatch):
+    checked_out = []
+
+    def probe(fn):
+        async def wrapper(*args):
+            checked_out.append(engine.pool.checkedout())
+            return await fn(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(auth_service, "hash_password_async", probe(auth_service.hash_password_async))
+    monkeypatch.setattr(auth_service, "verify_and_update_async", probe(auth_service.verify_and_update_async))
+    slug = f"t-{uuid4().hex[:10]}"
+    credentials = {"email": f"{slug}@example.com", "password": "SuperSecret123", "tenant_slug": slug}
+    with TestClient(app) as client:
+        register = {"company_name": "Hash Co", "slug": slug, "admin_email": credentials["email"], "admin_name": "Admin", "password": credentials["password"]}
+        assert client.post("/api/v1/auth/register", json=register).status_code == 200
+        assert client.post("/api/v1/auth/login", json=credentials).status_code == 200
+        assert client.post("/api/v1/auth/login", json={**credentials, "password": "WrongPassword1"}).status_code == 401
+    assert checked_out == [0, 0, 0]
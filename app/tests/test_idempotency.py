@@ -0,0 +1,94 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core import hashing, idempotency
+from app.core.idempotency import IdempotencyMiddleware, MemoryStore
+from app.core.security import create_access_token
+from app.main import app
+
+
+def _echo(calls: list[bytes]):
+    async def endpoint(scope, receive, send):
+        body = (await receive())["body"]
+        calls.append(body)
+        await asyncio.sleep(0.1)
+        payload = json.dumps({"n": len(calls), "echo": body.decode()}).encode()
+        await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+    return endpoint
+
+
+def test_idempotency_key_runs_once_and_replays_the_stored_response(monkeypatch):
+    store = MemoryStore(100)
+    monkeypatch.setattr(idempotency, "_store", lambda: store)
+    calls = []
+
+    async def run():
+        transport = httpx.ASGITransport(app=IdempotencyMiddleware(_echo(calls)))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            token = create_access_token(uuid4(), uuid4(), "ADMIN")
+            headers = {"Idempotency-Key": "abc", "Authorization": f"Bearer {token}"}
+            first, second = await asyncio.gather(
+                client.post("/things", content=b'{"a":1}', headers=headers),
+                client.post("/things", content=b'{"a":1}', headers=headers),
+            )
+            later = await client.post("/things", content=b'{"a":1}', headers=headers)
+            other = await client.post("/things", content=b'{"a":2}', headers=headers)
+            unkeyed = await client.post("/things", content=b'{"a":1}', headers={"Authorization": headers["Authorization"]})
+        return first, second, later, other, unkeyed
+
+    first, second, later, other, unkeyed = asyncio.run(run())
+    assert first.status_code == second.status_code == later.status_code == 201
+    assert first.content == second.content == later.content
+    assert {r.headers.get("idempotent-replayed") for r in (first, second)} == {None, "true"}
+    assert later.headers["idempotent-replayed"] == "true"
+    assert other.status_code == 422
+    assert unkeyed.status_code == 201 and unkeyed.json()["n"] == 2
+    assert len(calls) == 2
+
+
+
+def test_anonymous_keys_are_scoped_to_the_client_and_request(monkeypatch):
+    store = MemoryStore(100)
+    monkeypatch.setattr(idempotency, "_store", lambda: store)
+    calls = []
+
+    async def post(host: str, body: bytes) -> httpx.Response:
+        transport = httpx.ASGITransport(app=IdempotencyMiddleware(_echo(calls)), client=(host, 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/auth/login", content=body, headers={"Idempotency-Key": "1"})
+
+    async def run():
+        return (
+            await post("10.0.0.1", b'{"email":"a@x.com"}'),
+            await post("10.0.0.2", b'{"email":"b@x.com"}'),
+            await post("10.0.0.2", b'{"email":"a@x.com"}'),
+            await post("10.0.0.1", b'{"email":"a@x.com"}'),
+        )
+
+    first, other_client, other_host_same_body, retry = asyncio.run(run())
+    assert [r.status_code for r in (first, other_client, other_host_same_body)] == [201, 201, 201]
+    assert not any("idempotent-replayed" in r.headers for r in (first, other_client, other_host_same_body))
+    assert retry.content == first.content and retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 3
+
+def test_shed_login_is_not_replayed_to_the_retry(db_ready, monkeypatch):
+    slug = f"t-{uuid4().hex[:10]}"
+    credentials = {"email": f"{slug}@example.com", "password": "SuperSecret123", "tenant_slug": slug}
+    headers = {"Idempotency-Key": f"login-{slug}"}
+    with TestClient(app) as client:
+        register = {"company_name": "Shed Co", "slug": slug, "admin_email": credentials["email"], "admin_name": "Admin", "password": credentials["password"]}
+        assert client.post("/api/v1/auth/register", json=register).status_code == 200
+        monkeypatch.setattr(hashing.settings, "password_hash_max_pending", 0)
+        shed = client.post("/api/v1/auth/login", json=credentials, headers=headers)
+        monkeypatch.undo()
+        retry = client.post("/api/v1/auth/login", json=credentials, headers=headers)
+        replay = client.post("/api/v1/auth/login", json=credentials, headers=headers)
+    assert shed.status_code == 429
+    assert retry.status_code == 200 and "idempotent-replayed" not in retry.headers
+    assert replay.content == retry.content and replay.headers["idempotent-replayed"] == "true"
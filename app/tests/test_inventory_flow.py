@@ -1,22 +1,275 @@
-import pytest
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from uuid import UUID, uuid4
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, text
 
-from app.core.config import settings
+from app.core import export
 from app.main import app
+from app.services import inventory_service
+
 
+def test_auth_and_inventory_endpoints_exist(db_ready):
+    with TestClient(app) as client:
+        assert client.post("/api/v1/auth/login", json={"email": "x@x.com", "password": "12345678", "tenant_slug": "demo"}).status_code in {401, 403, 422}
 
-@pytest.fixture(scope="session")
-def db_ready():
-    engine = create_engine(settings.database_url)
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-    except Exception:
-        pytest.skip("PostgreSQL no disponible para pruebas de integración")
-    return True
 
+def _register(client: TestClient) -> dict:
+    slug = f"t-{uuid4().hex[:10]}"
+    tokens = client.post(
+        "/api/v1/auth/register",
+        json={"company_name": "Test Co", "slug": slug, "admin_email": f"{slug}@example.com", "admin_name": "Admin", "password": "SuperSecret123"},
+    ).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
 
-def test_auth_and_inventory_endpoints_exist(db_ready):
-    client = TestClient(app)
-    assert client.post("/api/v1/auth/login", json={"email": "x@x.com", "password": "12345678", "tenant_slug": "demo"}).status_code in {401, 403, 422}
+
+def test_movement_batch_all_or_nothing_and_per_item(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "B-1", "name": "Batch"}).json()["id"]
+        wh1, wh2 = (client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in ("A", "B"))
+        items = [
+            {"type": "IN", "product_id": product, "qty": 5, "to_warehouse_id": wh1, "idempotency_key": "in-1"},
+            {"type": "TRANSFER", "product_id": product, "qty": 2, "from_warehouse_id": wh1, "to_warehouse_id": wh2},
+            {"type": "OUT", "product_id": product, "qty": 10, "from_warehouse_id": wh2},
+        ]
+
+        response = client.post("/api/v1/inventory/movements/batch", headers=headers, json={"items": items})
+        assert response.status_code == 409
+        assert response.json()["detail"]["index"] == 2
+
+        body = client.post("/api/v1/inventory/movements/batch", headers=headers, json={"items": items, "all_or_nothing": False}).json()
+        assert [r["status_code"] for r in body["results"]] == [200, 200, 409]
+        assert body["applied"] == 2
+
+        replay = client.post("/api/v1/inventory/movements/batch", headers=headers, json={"items": items[:1], "all_or_nothing": False}).json()
+        assert replay["results"][0]["movement"]["id"] == body["results"][0]["movement"]["id"]
+        kardex = client.get(f"/api/v1/inventory/kardex/{product}", headers=headers).json()
+        assert sorted(m["type"] for m in kardex) == ["IN", "TRANSFER"]
+
+
+def test_refresh_rotation_and_reuse_detection(db_ready):
+    with TestClient(app) as client:
+        slug = f"t-{uuid4().hex[:10]}"
+        credentials = {"email": f"{slug}@example.com", "password": "SuperSecret123", "tenant_slug": slug}
+        first = client.post(
+            "/api/v1/auth/register",
+            json={"company_name": "Test Co", "slug": slug, "admin_email": credentials["email"], "admin_name": "Admin", "password": credentials["password"]},
+        ).json()["refresh_token"]
+        second = client.post("/api/v1/auth/login", json=credentials).json()["refresh_token"]
+
+        rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+        assert rotated.status_code == 200
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": "not-a-jwt"}).status_code == 401
+
+        # Replaying a rotated token revokes every live session of the membership.
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": first}).status_code == 401
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": second}).status_code == 401
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": rotated.json()["refresh_token"]}).status_code == 401
+
+
+def test_single_movements_update_balances_atomically(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "M-1", "name": "Move"}).json()["id"]
+        wh1, wh2 = (client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in ("A", "B"))
+
+        def move(**body):
+            return client.post("/api/v1/inventory/movements", headers=headers, json={"product_id": product, **body}).status_code
+
+        assert move(type="IN", qty=5, to_warehouse_id=wh1) == 200
+        assert move(type="OUT", qty=6, from_warehouse_id=wh1) == 409
+        assert move(type="TRANSFER", qty=5, from_warehouse_id=wh1, to_warehouse_id=wh2) == 200
+        assert move(type="TRANSFER", qty=1, from_warehouse_id=wh1, to_warehouse_id=wh2) == 409
+        assert move(type="ADJUST", qty=1, adjust_to_quantity=2, to_warehouse_id=wh1) == 200
+
+        balances = client.get("/api/v1/inventory/balances", headers=headers).json()
+        assert {b["warehouse_id"]: b["qty"] for b in balances} == {wh1: 2.0, wh2: 5.0}
+
+
+def test_summary_and_valuation_follow_movements(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "V-1", "name": "Valued", "cost": 2.5}).json()["id"]
+        wh1, wh2 = (client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in ("A", "B"))
+        move = {"product_id": product, "from_warehouse_id": wh1, "to_warehouse_id": wh2}
+        client.post("/api/v1/inventory/movements", headers=headers, json={"type": "IN", "qty": 10, "product_id": product, "to_warehouse_id": wh1})
+        client.post("/api/v1/inventory/movements", headers=headers, json={"type": "TRANSFER", "qty": 4, **move})
+        client.post("/api/v1/inventory/movements", headers=headers, json={"type": "OUT", "qty": 1, **move})
+        client.post("/api/v1/inventory/movements", headers=headers, json={"type": "ADJUST", "qty": 1, "adjust_to_quantity": 7, **move})
+        items = [{"type": "IN", "product_id": product, "qty": 3, "to_warehouse_id": wh2}, {"type": "OUT", "product_id": product, "qty": 1, "from_warehouse_id": wh2}]
+        client.post("/api/v1/inventory/movements/batch", headers=headers, json={"items": items})
+
+        balances = client.get("/api/v1/inventory/balances", headers=headers).json()
+        expected = sum(b["qty"] for b in balances)
+        (row,) = client.get("/api/v1/inventory/summary", headers=headers).json()
+        assert (row["product_id"], row["qty"], row["value"]) == (product, expected, expected * 2.5)
+        assert client.get("/api/v1/inventory/valuation", headers=headers).json() == {"products": 1, "total_qty": expected, "total_value": expected * 2.5}
+
+
+def test_list_endpoints_answer_304_until_a_write(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "E-1", "name": "Etag"}).json()["id"]
+        warehouse = client.post("/api/v1/warehouses", headers=headers, json={"name": "E"}).json()["id"]
+
+        for path in ("/api/v1/products", "/api/v1/warehouses", "/api/v1/inventory/balances"):
+            tag = client.get(path, headers=headers).headers["ETag"]
+            cached = client.get(path, headers={**headers, "If-None-Match": tag})
+            assert (cached.status_code, cached.content, cached.headers["ETag"]) == (304, b"", tag)
+
+        tag = client.get("/api/v1/inventory/balances", headers=headers).headers["ETag"]
+        client.post("/api/v1/inventory/movements", headers=headers, json={"type": "IN", "product_id": product, "qty": 1, "to_warehouse_id": warehouse})
+        fresh = client.get("/api/v1/inventory/balances", headers={**headers, "If-None-Match": tag})
+        assert fresh.status_code == 200 and fresh.headers["ETag"] != tag
+        assert client.get("/api/v1/products", headers={**headers, "If-None-Match": tag}).status_code == 200
+
+
+def test_etags_differ_per_query_string(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        for sku in ("Q-1", "Q-2"):
+            client.post("/api/v1/products", headers=headers, json={"sku": sku, "name": sku})
+
+        def tag(params: dict) -> str:
+            return client.get("/api/v1/products", headers=headers, params=params).headers["ETag"]
+
+        tags = {tag({"limit": 1}), tag({"limit": 5}), tag({"limit": 1, "offset": 1}), tag({})}
+        assert len(tags) == 4
+        assert tag({"limit": 1, "offset": 1}) == tag({"offset": 1, "limit": 1})
+        other = client.get("/api/v1/products", headers={**headers, "If-None-Match": tag({"limit": 1})}, params={"limit": 5})
+        assert other.status_code == 200 and len(other.json()) == 2
+
+
+def test_concurrent_moves_with_the_same_key_apply_once(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "K-1", "name": "Keyed"}).json()["id"]
+        first = client.post("/api/v1/warehouses", headers={**headers, "Idempotency-Key": "wh-a"}, json={"name": "A"})
+        again = client.post("/api/v1/warehouses", headers={**headers, "Idempotency-Key": "wh-a"}, json={"name": "A"})
+        assert again.content == first.content and again.headers["idempotent-replayed"] == "true"
+        wh = first.json()["id"]
+
+        movement = {"type": "IN", "product_id": product, "qty": 3, "to_warehouse_id": wh, "idempotency_key": "race"}
+        with ThreadPoolExecutor(4) as pool:
+            responses = list(pool.map(lambda _: client.post("/api/v1/inventory/movements", headers=headers, json=movement), range(4)))
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.json()["id"] for r in responses}) == 1
+        balances = client.get("/api/v1/inventory/balances", headers=headers).json()
+        assert [float(b["qty"]) for b in balances] == [3.0]
+
+
+# Statements per POST /inventory/movements by type, tighter than the endpoint's query_budget.
+MOVE_STATEMENT_BUDGET = {"IN": 6, "OUT": 5, "TRANSFER": 5, "ADJUST": 6, "replay": 3}
+
+
+def test_move_statement_budget(db_ready, request_statements):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "RT-1", "name": "Budget"}).json()["id"]
+        wh1, wh2 = (client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in ("A", "B"))
+        client.get("/api/v1/inventory/balances", headers=headers)
+        cases = [
+            ("IN", {"type": "IN", "qty": 5, "to_warehouse_id": wh1, "idempotency_key": "rt-in"}),
+            ("replay", {"type": "IN", "qty": 5, "to_warehouse_id": wh1, "idempotency_key": "rt-in"}),
+            ("OUT", {"type": "OUT", "qty": 1, "from_warehouse_id": wh1}),
+            ("TRANSFER", {"type": "TRANSFER", "qty": 1, "from_warehouse_id": wh1, "to_warehouse_id": wh2}),
+            ("ADJUST", {"type": "ADJUST", "qty": 1, "to_warehouse_id": wh2, "adjust_to_quantity": 7}),
+        ]
+        for name, body in cases:
+            assert client.post("/api/v1/inventory/movements", headers=headers, json={**body, "product_id": product}).status_code == 200
+            _, _, log = request_statements[-1]
+            assert len(log) <= MOVE_STATEMENT_BUDGET[name], f"{name}:\n{log.report()}"
+
+
+def test_move_references_are_cached_after_the_first_lookup(db_ready, request_statements):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "RC-1", "name": "Cached"}).json()["id"]
+        wh = client.post("/api/v1/warehouses", headers=headers, json={"name": "A"}).json()["id"]
+        lookups = []
+        for _ in range(2):
+            body = {"type": "IN", "product_id": product, "qty": 1, "to_warehouse_id": wh}
+            assert client.post("/api/v1/inventory/movements", headers=headers, json=body).status_code == 200
+            _, _, log = request_statements[-1]
+            lookups.append([statement for statement in log.statements if "FROM products" in statement])
+        assert len(lookups[0]) == 1
+        assert lookups[1] == []
+
+
+def test_opposing_transfers_do_not_deadlock(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "T-1", "name": "Transfer"}).json()["id"]
+        wh1, wh2 = (client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in ("A", "B"))
+        for wh in (wh1, wh2):
+            client.post("/api/v1/inventory/movements", headers=headers, json={"type": "IN", "product_id": product, "qty": 1000, "to_warehouse_id": wh})
+
+        def transfer(i: int):
+            source, target = (wh1, wh2) if i % 2 else (wh2, wh1)
+            body = {"type": "TRANSFER", "product_id": product, "qty": 1, "from_warehouse_id": source, "to_warehouse_id": target}
+            return client.post("/api/v1/inventory/movements", headers=headers, json=body).status_code
+
+        with ThreadPoolExecutor(16) as pool:
+            assert set(pool.map(transfer, range(200))) == {200}
+        balances = client.get("/api/v1/inventory/balances", headers=headers).json()
+        assert sorted(float(b["qty"]) for b in balances) == [1000.0, 1000.0]
+
+
+def _stock(client: TestClient, headers: dict, skus: tuple[str, ...], warehouses: tuple[str, ...]) -> tuple[list[str], list[str]]:
+    """One IN of a distinct qty per (product, warehouse); returns (product ids, warehouse ids)."""
+    products = [client.post("/api/v1/products", headers=headers, json={"sku": sku, "name": sku}).json()["id"] for sku in skus]
+    whs = [client.post("/api/v1/warehouses", headers=headers, json={"name": name}).json()["id"] for name in warehouses]
+    items = [
+        {"type": "IN", "product_id": product, "qty": i + 1, "to_warehouse_id": wh}
+        for i, (product, wh) in enumerate((product, wh) for product in products for wh in whs)
+    ]
+    assert client.post("/api/v1/inventory/movements/batch", headers=headers, json={"items": items}).status_code == 200
+    return products, whs
+
+
+def test_exports_stream_every_row_of_the_tenant_across_fetch_batches(db_ready, monkeypatch):
+    # Two rows per fetch and per chunk, so six rows take several of each.
+    monkeypatch.setattr(inventory_service, "EXPORT_CHUNK_ROWS", 2)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    with TestClient(app) as client:
+        headers = _register(client)
+        products, whs = _stock(client, headers, ("X-1", "X-2"), ("A", "B", "C"))
+        other = _register(client)
+        (other_product,), _ = _stock(client, other, ("X-1",), ("A",))
+        other_rows = client.get("/api/v1/inventory/export/kardex", headers=other).text.splitlines()
+        assert [json.loads(line)["product_id"] for line in other_rows] == [other_product]
+
+        kardex = client.get("/api/v1/inventory/export/kardex", headers=headers)
+        assert kardex.headers["content-type"] == "application/x-ndjson"
+        assert kardex.headers["content-disposition"] == 'attachment; filename="kardex.ndjson"'
+        rows = [json.loads(line) for line in kardex.text.splitlines()]
+        expected = {(p, w): float(i + 1) for i, (p, w) in enumerate((p, w) for p in products for w in whs)}
+        assert {(r["product_id"], r["to_warehouse_id"]): r["qty"] for r in rows} == expected
+        assert len(rows) == 6 and {r["type"] for r in rows} == {"IN"}
+        assert rows == sorted(rows, key=lambda r: (datetime.fromisoformat(r["created_at"]), UUID(r["id"])))
+        filtered = client.get("/api/v1/inventory/export/kardex", headers=headers, params={"product_id": products[1]})
+        assert [json.loads(line)["product_id"] for line in filtered.text.splitlines()] == [products[1]] * 3
+
+        csv_kardex = client.get("/api/v1/inventory/export/kardex", headers=headers, params={"format": "csv"})
+        assert csv_kardex.headers["content-type"].startswith("text/csv")
+        header, *lines = list(csv.reader(io.StringIO(csv_kardex.text)))
+        assert header == ["id", "type", "qty", "product_id", "from_warehouse_id", "to_warehouse_id", "reference", "created_at"]
+        assert [line[0] for line in lines] == [r["id"] for r in rows]
+
+        balances = client.get("/api/v1/inventory/export/balances", headers=headers, params={"format": "csv"})
+        assert balances.headers["content-type"].startswith("text/csv")
+        assert balances.headers["content-disposition"] == 'attachment; filename="balances.csv"'
+        header, *lines = list(csv.reader(io.StringIO(balances.text)))
+        assert header == ["product_id", "warehouse_id", "qty"]
+        assert {(p, w): float(qty) for p, w, qty in lines} == expected
+        assert [(p, w) for p, w, _ in lines] == sorted(expected)
+
+        ndjson = client.get("/api/v1/inventory/export/balances", headers=headers, params={"warehouse_id": whs[0]})
+        assert ndjson.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in ndjson.text.splitlines()] == [
+            {"product_id": p, "warehouse_id": whs[0], "qty": expected[(p, whs[0])]} for p in sorted(products)
+        ]
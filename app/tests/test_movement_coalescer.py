@@ -0,0 +1,85 @@
+import asyncio
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.main import app
+from app.models import InventoryBalance, MovementType, ProductStockTotal, StockMovement
+from app.services.movement_coalescer import MovementCoalescer
+from app.tests.test_inventory_flow import _register
+
+
+class _FailingCommit(AsyncSession):
+    async def commit(self) -> None:
+        raise RuntimeError("commit failed")
+
+
+def _movement(kind: MovementType, qty: int, tenant_id: UUID, user_id: UUID, product_id: UUID, warehouse_id: UUID) -> StockMovement:
+    return StockMovement(
+        tenant_id=tenant_id, type=kind, qty=Decimal(qty), product_id=product_id, created_by=user_id,
+        from_warehouse_id=warehouse_id if kind == MovementType.OUT else None,
+        to_warehouse_id=warehouse_id if kind == MovementType.IN else None,
+    )
+
+
+def _hot_pair() -> tuple[UUID, UUID, UUID, UUID]:
+    """(tenant_id, user_id, product_id, warehouse_id) of a fresh tenant."""
+    with TestClient(app) as client:
+        headers = _register(client)
+        me = client.get("/api/v1/auth/me", headers=headers).json()
+        product = client.post("/api/v1/products", headers=headers, json={"sku": "H-1", "name": "Hot"}).json()["id"]
+        warehouse = client.post("/api/v1/warehouses", headers=headers, json={"name": "Hot"}).json()["id"]
+    return UUID(me["tenant_id"]), UUID(me["user_id"]), UUID(product), UUID(warehouse)
+
+
+async def _concurrent_outs(tenant_id: UUID, user_id: UUID, product_id: UUID, warehouse_id: UUID):
+    engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    coalescer = MovementCoalescer({(product_id, warehouse_id)}, sessions, window_ms=20)
+
+    def movement(kind: MovementType, qty: int) -> StockMovement:
+        return _movement(kind, qty, tenant_id, user_id, product_id, warehouse_id)
+
+    assert await coalescer.submit(movement(MovementType.IN, 10), warehouse_id, Decimal(10))
+    outcomes = await asyncio.gather(
+        *(coalescer.submit(movement(MovementType.OUT, 1), warehouse_id, Decimal(-1)) for _ in range(15)), return_exceptions=True
+    )
+    async with sessions() as db:
+        qty = await db.scalar(select(InventoryBalance.qty).where(InventoryBalance.tenant_id == tenant_id))
+        total = await db.scalar(select(ProductStockTotal.qty).where(ProductStockTotal.tenant_id == tenant_id))
+        ledger = await db.scalar(select(func.count()).select_from(StockMovement).where(StockMovement.tenant_id == tenant_id))
+    await engine.dispose()
+    return outcomes, (qty, total), ledger
+
+
+def test_hot_pair_outs_are_netted_per_caller(db_ready):
+    outcomes, qty, ledger = asyncio.run(_concurrent_outs(*_hot_pair()))
+
+    assert outcomes[:10] == [True] * 10
+    assert all(isinstance(outcome, HTTPException) and outcome.status_code == 409 for outcome in outcomes[10:])
+    assert qty == (0, 0)
+    assert ledger == 11
+
+
+async def _group_with_failed_commit(tenant_id: UUID, user_id: UUID, product_id: UUID, warehouse_id: UUID) -> list:
+    engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, class_=_FailingCommit, expire_on_commit=False)
+    coalescer = MovementCoalescer({(product_id, warehouse_id)}, sessions, window_ms=20)
+    group = [(MovementType.IN, 1, Decimal(1)), (MovementType.OUT, 1, Decimal(-1)), (MovementType.OUT, 1, Decimal(-1))]
+    movements = [(_movement(kind, qty, tenant_id, user_id, product_id, warehouse_id), delta) for kind, qty, delta in group]
+    outcomes = await asyncio.gather(
+        *(coalescer.submit(movement, warehouse_id, delta) for movement, delta in movements), return_exceptions=True
+    )
+    await engine.dispose()
+    return outcomes
+
+
+def test_failed_group_commit_hands_every_movement_back_to_its_caller(db_ready):
+    # The second OUT only lacks stock because of the first, which was never committed: it must be re-run, not refused.
+    assert asyncio.run(_group_with_failed_commit(*_hot_pair())) == [False, False, False]
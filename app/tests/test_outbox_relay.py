@@ -0,0 +1,52 @@
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.events.relay import InMemoryBroker, OutboxRelay
+from app.models import OutboxEvent, Tenant
+
+
+class FailingBroker:
+    async def publish(self, event: OutboxEvent) -> None:
+        raise ConnectionError("broker down")
+
+
+async def _relay_scenario():
+    engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    tenant = Tenant(name="Outbox", slug=f"outbox-{uuid4().hex[:8]}")
+    async with sessions() as db:
+        db.add(tenant)
+        await db.flush()
+        db.add_all(
+            OutboxEvent(tenant_id=tenant.id, aggregate_type="product", aggregate_id=uuid4(), event_type="created", payload="{}")
+            for _ in range(3)
+        )
+        await db.commit()
+
+    await OutboxRelay(FailingBroker(), sessions, batch_size=1000).relay_once()
+    async with sessions() as db:
+        failed = (await db.scalars(select(OutboxEvent).where(OutboxEvent.tenant_id == tenant.id))).all()
+        # Rescheduled rows are not claimable until their backoff expires.
+        for event in failed:
+            event.available_at = event.created_at
+        await db.commit()
+
+    broker = InMemoryBroker()
+    await OutboxRelay(broker, sessions, batch_size=1000).relay_once()
+    async with sessions() as db:
+        published = (await db.scalars(select(OutboxEvent).where(OutboxEvent.tenant_id == tenant.id))).all()
+    await engine.dispose()
+    return tenant, failed, published, broker
+
+
+def test_relay_backs_off_on_failure_then_publishes(db_ready):
+    tenant, failed, published, broker = asyncio.run(_relay_scenario())
+
+    assert all(event.attempts == 1 and event.published_at is None and "broker down" in event.last_error for event in failed)
+    assert all(event.published_at is not None for event in published)
+    assert sum(message["tenant_id"] == str(tenant.id) for message in broker.messages) == 3
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    created_at, row_id = datetime.now(timezone.utc), uuid4()
+    assert decode_cursor(encode_cursor(created_at, row_id), datetime.fromisoformat, UUID) == (created_at, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor("only-one")])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, datetime.fromisoformat, UUID)
+    assert exc.value.status_code == 400
+
+
+def test_paginate_emits_cursor_only_when_more_rows_exist():
+    assert paginate([1, 2], 2, lambda row: (row,)) == ([1, 2], None)
+    page, cursor = paginate([1, 2, 3], 2, lambda row: (row,))
+    assert page == [1, 2]
+    assert decode_cursor(cursor, int) == (2,)
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.jobs import partitions
+from app.jobs.partitions import _overlaps, add_months, month_start, parse_bound
+from app.main import app
+from app.tests.test_inventory_flow import _register
+
+
+def test_partition_bounds_are_parsed_and_checked_for_overlap():
+    legacy = parse_bound("stock_movements_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')")
+    monthly = parse_bound(
+        "stock_movements_p202611", "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"
+    )
+    assert legacy.lower is None
+    assert monthly.upper == datetime(2026, 12, 1, tzinfo=timezone.utc)
+    assert parse_bound("stock_movements_default", "DEFAULT").is_default
+
+    october = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    assert _overlaps([legacy, monthly], october, add_months(october, 1))
+    assert not _overlaps([legacy, monthly], add_months(october, 2), add_months(october, 3))
+    assert add_months(datetime(2026, 12, 1, tzinfo=timezone.utc), 1) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+
+
+async def _maintain(parent: str, tenant_id: UUID) -> tuple[list[str], bool, set[str]]:
+    engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE TABLE {parent} (created_at timestamptz NOT NULL) PARTITION BY RANGE (created_at)"))
+            await conn.execute(
+                text(f"CREATE TABLE {parent}_p200101 PARTITION OF {parent} FOR VALUES FROM ('2001-01-01+00') TO ('2001-02-01+00')")
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO movement_idempotency_keys (tenant_id, idempotency_key, movement_id, created_at) "
+                    "VALUES (:tenant_id, 'expired', :id, '2001-01-15 00:00+00'), (:tenant_id, 'live', :id, now())"
+                ),
+                {"tenant_id": tenant_id, "id": uuid4()},
+            )
+        await partitions.maintain(engine, ahead=1, retain_months=24, drop=True)
+        async with engine.connect() as conn:
+            names = [partition.name for partition in await partitions.list_partitions(conn)]
+            dropped = await conn.scalar(text("SELECT to_regclass(:name) IS NULL"), {"name": f"{parent}_p200101"})
+            keys = set(
+                await conn.scalars(
+                    text("SELECT idempotency_key FROM movement_idempotency_keys WHERE tenant_id = :tenant_id"), {"tenant_id": tenant_id}
+                )
+            )
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {parent}, {parent}_p200101"))
+        await engine.dispose()
+    return names, dropped, keys
+
+
+def test_maintain_creates_ahead_drops_expired_partitions_and_purges_their_keys(db_ready, monkeypatch):
+    # A scratch parent stands in for stock_movements, so the ledger's own partitions are left alone.
+    parent = f"partition_test_{uuid4().hex[:8]}"
+    monkeypatch.setattr(partitions, "PARENT", parent)
+    with TestClient(app) as client:
+        tenant_id = UUID(client.get("/api/v1/auth/me", headers=_register(client)).json()["tenant_id"])
+
+    names, dropped, keys = asyncio.run(_maintain(parent, tenant_id))
+
+    this_month = month_start(datetime.now(timezone.utc))
+    assert names == [f"{parent}_p{this_month:%Y%m}", f"{parent}_p{add_months(this_month, 1):%Y%m}"]
+    assert dropped
+    assert keys == {"live"}
@@ -0,0 +1,32 @@
+import asyncio
+from uuid import uuid4
+
+from app.core.cache import TTLCache
+from app.core.principal_cache import invalidate_principal, principal_cache
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired():
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    expired = TTLCache(maxsize=2, ttl_seconds=0)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_invalidate_principal_by_tenant_and_by_user():
+    user_id, tenant_a, tenant_b = uuid4(), uuid4(), uuid4()
+    principal_cache.set((user_id, tenant_a), "a")
+    principal_cache.set((user_id, tenant_b), "b")
+
+    asyncio.run(invalidate_principal(user_id, tenant_a))
+    assert principal_cache.get((user_id, tenant_a)) is None
+    assert principal_cache.get((user_id, tenant_b)) == "b"
+
+    asyncio.run(invalidate_principal(user_id))
+    assert principal_cache.get((user_id, tenant_b)) is None
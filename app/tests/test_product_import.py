@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.tests.test_inventory_flow import _register
+
+
+def _import(client: TestClient, headers: dict, filename: str, content: str) -> dict:
+    response = client.post("/api/v1/products/import", headers=headers, files={"file": (filename, content.encode())})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _by_sku(client: TestClient, headers: dict) -> dict[str, dict]:
+    return {p["sku"]: p for p in client.get("/api/v1/products", headers=headers, params={"limit": 100}).json()}
+
+
+def test_csv_import_upserts_and_reports_bad_rows(db_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        client.post("/api/v1/products", headers=headers, json={"sku": "C-0", "name": "Old", "cost": 1})
+        csv_file = "sku,name,cost,price\nC-0,Renamed,2.5,4\nC-1,First,1,2\nC-1,Again,1,2\n,No sku,1,2\nC-2,Second,3,5\n"
+
+        result = _import(client, headers, "catalog.csv", csv_file)
+        assert (result["inserted"], result["updated"], result["failed"]) == (2, 1, 2)
+        assert [(e["row"], e["sku"]) for e in result["errors"]] == [(3, "C-1"), (4, None)]
+        assert result["errors"][0]["detail"] == "Duplicate sku in file"
+        assert result["errors"][1]["detail"].startswith("sku:")
+
+        products = _by_sku(client, headers)
+        assert sorted(products) == ["C-0", "C-1", "C-2"]
+        assert (products["C-0"]["name"], products["C-0"]["cost"], products["C-1"]["name"]) == ("Renamed", 2.5, "First")
+
+
+def test_ndjson_import_reports_invalid_lines_and_keeps_tenants_apart(db_ready):
+    with TestClient(app) as client:
+        headers, other = _register(client), _register(client)
+        theirs = client.post("/api/v1/products", headers=other, json={"sku": "N-1", "name": "Theirs"}).json()
+        lines = ['{"sku": "N-1", "name": "Ours"}', "{not json", '{"name": "No sku"}', '{"sku": "N-2", "name": "Second"}']
+
+        result = _import(client, headers, "catalog.ndjson", "\n".join(lines) + "\n")
+        assert (result["inserted"], result["updated"], result["failed"]) == (2, 0, 2)
+        assert [(e["row"], e["detail"].split(":")[0]) for e in result["errors"]] == [(2, "row"), (3, "sku")]
+        assert "Invalid JSON" in result["errors"][0]["detail"]
+
+        again = _import(client, headers, "catalog.ndjson", lines[0].replace("Ours", "Ours v2") + "\n")
+        assert (again["inserted"], again["updated"], again["failed"]) == (0, 1, 0)
+
+        ours = _by_sku(client, headers)
+        assert {sku: p["name"] for sku, p in ours.items()} == {"N-1": "Ours v2", "N-2": "Second"}
+        assert ours["N-1"]["id"] != theirs["id"]
+        assert _by_sku(client, other) == {"N-1": theirs}
@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.tests.test_inventory_flow import _register
+
+
+def test_search_ranks_sku_before_name_and_pages_by_cursor(trgm_ready):
+    with TestClient(app) as client:
+        headers = _register(client)
+        for sku, name in [("TOR-100", "Tuerca"), ("TOR-1", "Arandela"), ("MAD-7", "Tornillo para madera"), ("HEX-2", "Tornillo hexagonal")]:
+            client.post("/api/v1/products", headers=headers, json={"sku": sku, "name": name})
+
+        skus = [p["sku"] for p in client.get("/api/v1/products/search", headers=headers, params={"q": "tor-1"}).json()]
+        assert skus[:2] == ["TOR-1", "TOR-100"]
+
+        first = client.get("/api/v1/products/search", headers=headers, params={"q": "tornilo", "limit": 1})
+        second = client.get("/api/v1/products/search", headers=headers, params={"q": "tornilo", "limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+        assert {first.json()[0]["sku"], second.json()[0]["sku"]} == {"MAD-7", "HEX-2"}
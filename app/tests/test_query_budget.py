@@ -0,0 +1,32 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import query_budget
+from app.core.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+
+
+def test_requests_over_their_endpoint_budget_fail_with_the_statements():
+    engine = create_engine("sqlite://")
+    query_budget.install(engine)
+    api = FastAPI()
+    api.add_middleware(QueryBudgetMiddleware)
+
+    @api.get("/items/{n}")
+    @query_budget.query_budget(2)
+    def items(n: int):
+        with engine.connect() as conn:
+            return [conn.execute(text(f"SELECT {i}")).scalar() for i in range(n)]
+
+    @api.get("/unbudgeted/{n}")
+    def unbudgeted(n: int):
+        return items(n)
+
+    with TestClient(api) as client:
+        assert client.get("/items/2").json() == [0, 1]
+        assert client.get("/unbudgeted/5").status_code == 200
+        with pytest.raises(QueryBudgetExceeded) as exc:
+            client.get("/items/3")
+    assert "ran 3 SQL statements, budget is 2" in str(exc.value)
+    assert "3. SELECT 2" in str(exc.value)
@@ -0,0 +1,35 @@
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+from app.tests.test_inventory_flow import _register
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    route = "/api/v1/products/{product_id}"
+    before = _sample("http_request_duration_seconds_count", method="PATCH", route=route, status="401")
+    with TestClient(app) as client:
+        client.patch(f"/api/v1/products/{uuid4()}", json={})
+        client.get(f"/no/such/{uuid4()}")
+        body = client.get("/metrics").text
+    assert _sample("http_request_duration_seconds_count", method="PATCH", route=route, status="401") == before + 1
+    assert _sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert _sample("http_requests_in_flight", method="PATCH", route=route) == 0
+    assert "db_pool_saturation" in body and "/no/such" not in body
+
+
+def test_sql_statements_are_attributed_to_the_route(db_ready):
+    route = "/api/v1/warehouses"
+    with TestClient(app) as client:
+        headers = _register(client)
+        before = _sample("db_statement_duration_seconds_count", route=route)
+        assert client.get(route, headers=headers).status_code == 200
+    assert _sample("db_statement_duration_seconds_count", route=route) > before
+    assert _sample("db_statements_per_request_count", route=route) >= 1
+    assert _sample("db_pool_checkout_seconds_count") >= 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from app.core import retry
+from app.core.metrics import DB_RETRIES, DB_RETRIES_EXHAUSTED
+
+
+class _PgError(Exception):
+    def __init__(self, sqlstate: str):
+        self.sqlstate = sqlstate
+
+
+class _Session:
+    rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def _failing(sqlstate: str, failures: int):
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise DBAPIError("UPDATE inventory_balances", {}, _PgError(sqlstate))
+        return "done"
+
+    return operation, calls
+
+
+def test_contention_errors_are_retried_within_the_budget(monkeypatch):
+    monkeypatch.setattr(retry, "backoff", lambda attempt: 0)
+    monkeypatch.setattr(retry.settings, "db_retry_attempts", 3)
+    session = _Session()
+    before = DB_RETRIES.labels("test", "deadlock")._value.get()
+
+    operation, calls = _failing("40P01", failures=2)
+    assert asyncio.run(retry.with_retry(session, "test", operation)) == "done"
+    assert len(calls) == 3 and session.rollbacks == 2
+    assert DB_RETRIES.labels("test", "deadlock")._value.get() - before == 2
+
+    operation, calls = _failing("55P03", failures=3)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(retry.with_retry(session, "test", operation))
+    assert exc.value.status_code == 503 and len(calls) == 3
+    assert DB_RETRIES_EXHAUSTED.labels("test", "lock_timeout")._value.get() == 1
+
+    operation, calls = _failing("23505", failures=1)
+    with pytest.raises(DBAPIError):
+        asyncio.run(retry.with_retry(session, "test", operation))
+    assert len(calls) == 1
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(retry.settings, "db_retry_base_delay_seconds", 0.1)
+    monkeypatch.setattr(retry.settings, "db_retry_max_delay_seconds", 0.3)
+    delays = [retry.backoff(attempt) for attempt in range(1, 6) for _ in range(50)]
+    assert all(0 <= delay <= 0.3 for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,137 @@
+"""Concurrency benchmark for stock movements and balance reads.
+
+Runs against a live API (``uvicorn app.main:app``) backed by PostgreSQL:
+
+    python -m benchmarks.concurrency --base-url http://localhost:8000 --requests 2000 --concurrency 64
+
+Each run registers a throwaway tenant, seeds products and warehouses, then
+drives the two phases and prints throughput and latency percentiles as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+BENCH_PASSWORD = "BenchPassword123"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list[float], errors: int, elapsed: float, shed: int = 0) -> dict:
+    return {
+        "phase": name,
+        "requests": len(latencies) + errors + shed,
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_phase(name: str, total: int, concurrency: int, make_request) -> dict:
+    latencies: list[float] = []
+    errors = shed = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors, shed
+        while not queue.empty():
+            i = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.status_code < 400:
+                latencies.append(time.perf_counter() - started)
+            elif response.status_code == 429:
+                shed += 1
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - started, shed)
+
+
+async def seed(client: httpx.AsyncClient, products: int, slug: str | None = None) -> tuple[dict, list[str], list[str]]:
+    slug = slug or f"bench-{uuid.uuid4().hex[:10]}"
+    tokens = (
+        await client.post(
+            "/api/v1/auth/register",
+            json={
+                "company_name": "Benchmark",
+                "slug": slug,
+                "admin_email": f"{slug}@bench.example.com",
+                "admin_name": "Benchmark",
+                "password": BENCH_PASSWORD,
+            },
+        )
+    ).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    warehouse_ids = [
+        (await client.post("/api/v1/warehouses", headers=headers, json={"name": f"WH-{i}"})).json()["id"] for i in range(2)
+    ]
+    product_ids = []
+    for i in range(products):
+        product_id = (await client.post("/api/v1/products", headers=headers, json={"sku": f"SKU-{i}", "name": f"Product {i}"})).json()["id"]
+        product_ids.append(product_id)
+        for warehouse_id in warehouse_ids:
+            await client.post(
+                "/api/v1/inventory/movements",
+                headers=headers,
+                json={"type": "IN", "product_id": product_id, "qty": 1_000_000, "to_warehouse_id": warehouse_id},
+            )
+    return headers, product_ids, warehouse_ids
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        headers, product_ids, warehouse_ids = await seed(client, args.products)
+
+        def movement(i: int):
+            kind = ("IN", "OUT", "TRANSFER")[i % 3]
+            source, target = random.sample(warehouse_ids, 2)
+            body = {"type": kind, "product_id": random.choice(product_ids), "qty": 1}
+            if kind in ("OUT", "TRANSFER"):
+                body["from_warehouse_id"] = source
+            if kind in ("IN", "TRANSFER"):
+                body["to_warehouse_id"] = target
+            return client.post("/api/v1/inventory/movements", headers=headers, json=body)
+
+        def balances(i: int):
+            return client.get("/api/v1/inventory/balances", headers=headers, params={"limit": 50})
+
+        results = [
+            await run_phase("movements", args.requests, args.concurrency, movement),
+            await run_phase("balances", args.requests, args.concurrency, balances),
+        ]
+    print(json.dumps({"concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--products", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""Hot-SKU benchmark: N concurrent OUTs on one (product, warehouse) pair.
+
+Runs the app in-process (ASGI transport, no uvicorn) against DATABASE_URL so
+the pair can be switched into group-commit mode between the two runs:
+
+    python -m benchmarks.hot_sku --movements 1000 --concurrency 64
+
+Stock is seeded to exactly ``--movements`` units, so every OUT should succeed
+in both modes.
+"""
+
+import argparse
+import asyncio
+import json
+from uuid import UUID
+
+import httpx
+
+from app.core.db import engine
+from app.main import app
+from app.services.movement_coalescer import movement_coalescer
+from benchmarks.concurrency import run_phase, seed
+
+
+async def main(args: argparse.Namespace) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        results = []
+        for mode in ("row_lock", "group_commit"):
+            headers, (product_id,), (warehouse_id, _) = await seed(client, 1)
+            await client.post(
+                "/api/v1/inventory/movements",
+                headers=headers,
+                json={"type": "ADJUST", "product_id": product_id, "qty": 1, "adjust_to_quantity": args.movements, "to_warehouse_id": warehouse_id},
+            )
+            movement_coalescer.pairs = {(UUID(product_id), UUID(warehouse_id))} if mode == "group_commit" else set()
+
+            def out(i: int, product_id=product_id, warehouse_id=warehouse_id, headers=headers):
+                body = {"type": "OUT", "product_id": product_id, "qty": 1, "from_warehouse_id": warehouse_id}
+                return client.post("/api/v1/inventory/movements", headers=headers, json=body)
+
+            results.append(await run_phase(mode, args.movements, args.concurrency, out))
+    await engine.dispose()
+    print(json.dumps({"concurrency": args.concurrency, "window_ms": movement_coalescer.window * 1000, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movements", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+"""Login storm benchmark.
+
+Measures login latency on its own, inventory reads on their own, and both
+together, to show how much a burst of logins degrades `/inventory` traffic on
+the same API:
+
+    python -m benchmarks.login --base-url http://localhost:8000 --logins 200 --reads 1000
+
+Logins shed by admission control (429) are reported as ``shed``, not errors.
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+import httpx
+
+from benchmarks.concurrency import BENCH_PASSWORD, run_phase, seed
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.login_concurrency + args.read_concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        slug = f"bench-{uuid.uuid4().hex[:10]}"
+        headers, _, _ = await seed(client, args.products, slug)
+        credentials = {"email": f"{slug}@bench.example.com", "password": BENCH_PASSWORD, "tenant_slug": slug}
+
+        def login(i: int):
+            return client.post("/api/v1/auth/login", json=credentials)
+
+        def balances(i: int):
+            return client.get("/api/v1/inventory/balances", headers=headers, params={"limit": 50})
+
+        results = [
+            await run_phase("login", args.logins, args.login_concurrency, login),
+            await run_phase("inventory", args.reads, args.read_concurrency, balances),
+            *await asyncio.gather(
+                run_phase("login_mixed", args.logins, args.login_concurrency, login),
+                run_phase("inventory_mixed", args.reads, args.read_concurrency, balances),
+            ),
+        ]
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--read-concurrency", type=int, default=16)
+    parser.add_argument("--products", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,190 @@
+"""Full benchmark suite for the inventory hot paths, for comparing commits.
+
+Runs against a live API (``uvicorn app.main:app``) and reads lock statistics
+from the same PostgreSQL it uses:
+
+    python -m benchmarks.suite --base-url http://localhost:8000 --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --output new.json --compare old.json
+
+Phases: IN/OUT/TRANSFER movements, balance and kardex reads, login, refresh
+rotation, and movements mixed with reads. Each reports throughput and
+p50/p95/p99 plus, from PostgreSQL, the deadlocks detected during the phase and
+the time sessions spent waiting on locks (sampled from ``pg_stat_activity``;
+the database role needs ``pg_read_all_stats`` to see other roles' sessions).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from benchmarks.concurrency import BENCH_PASSWORD, run_phase, seed
+
+COMPARED = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "lock_wait_s", "deadlocks")
+
+
+class LockProbe:
+    """Deadlock counter and lock-wait sampler for the benchmarked database."""
+
+    def __init__(self, database_url: str, interval: float):
+        self.engine = create_async_engine(database_url, pool_size=2)
+        self.interval = interval
+
+    async def deadlocks(self) -> int:
+        async with self.engine.connect() as conn:
+            return await conn.scalar(text("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"))
+
+    async def sample_lock_waits(self, stop: asyncio.Event) -> float:
+        waited = 0.0
+        async with self.engine.connect() as conn:
+            while not stop.is_set():
+                waiting = await conn.scalar(
+                    text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND wait_event_type = 'Lock'")
+                )
+                await conn.commit()
+                waited += waiting * self.interval
+                try:
+                    await asyncio.wait_for(stop.wait(), self.interval)
+                except TimeoutError:
+                    pass
+        return waited
+
+    async def measure(self, *phases) -> list[dict]:
+        """Run ``phases`` together and attach the lock statistics of the window to each result."""
+        before = await self.deadlocks()
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(self.sample_lock_waits(stop))
+        results = await asyncio.gather(*phases)
+        stop.set()
+        waited = await sampler
+        # Backends publish their statistics at most once a second.
+        await asyncio.sleep(1.1)
+        deadlocks = await self.deadlocks() - before
+        for result in results:
+            result.update(lock_wait_s=round(waited, 3), deadlocks=deadlocks)
+        return list(results)
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Relative change per phase and metric, in percent (positive is higher)."""
+    previous = {result["phase"]: result for result in baseline["results"]}
+    changes = {}
+    for result in current["results"]:
+        old = previous.get(result["phase"])
+        if old is None:
+            continue
+        changes[result["phase"]] = {
+            metric: round((result[metric] - old[metric]) / old[metric] * 100, 1) if old[metric] else None
+            for metric in COMPARED
+            if metric in result and metric in old
+        }
+    return {"baseline_commit": baseline.get("commit"), "change_pct": changes}
+
+
+async def run_suite(args: argparse.Namespace) -> list[dict]:
+    probe = LockProbe(args.database_url, args.sample_interval)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+            slug = f"bench-{uuid.uuid4().hex[:10]}"
+            headers, product_ids, warehouse_ids = await seed(client, args.products, slug)
+            credentials = {"email": f"{slug}@bench.example.com", "password": BENCH_PASSWORD, "tenant_slug": slug}
+
+            def movement(i: int):
+                kind = ("IN", "OUT", "TRANSFER")[i % 3]
+                source, target = random.sample(warehouse_ids, 2)
+                body = {"type": kind, "product_id": random.choice(product_ids), "qty": 1}
+                if kind in ("OUT", "TRANSFER"):
+                    body["from_warehouse_id"] = source
+                if kind in ("IN", "TRANSFER"):
+                    body["to_warehouse_id"] = target
+                return client.post("/api/v1/inventory/movements", headers=headers, json=body)
+
+            def balances(i: int):
+                return client.get("/api/v1/inventory/balances", headers=headers, params={"limit": 50})
+
+            def kardex(i: int):
+                return client.get(f"/api/v1/inventory/kardex/{random.choice(product_ids)}", headers=headers, params={"limit": 50})
+
+            def login(i: int):
+                return client.post("/api/v1/auth/login", json=credentials)
+
+            # A refresh token is single-use, so each in-flight refresh takes one from the pool and returns its successor.
+            refresh_tokens: asyncio.Queue[str] = asyncio.Queue()
+            for _ in range(args.auth_concurrency):
+                refresh_tokens.put_nowait((await client.post("/api/v1/auth/login", json=credentials)).json()["refresh_token"])
+
+            async def refresh(i: int):
+                response = await client.post("/api/v1/auth/refresh", json={"refresh_token": await refresh_tokens.get()})
+                if response.status_code == 200:
+                    refresh_tokens.put_nowait(response.json()["refresh_token"])
+                return response
+
+            results = [
+                *await probe.measure(run_phase("movements", args.requests, args.concurrency, movement)),
+                *await probe.measure(run_phase("balances", args.requests, args.concurrency, balances)),
+                *await probe.measure(run_phase("kardex", args.requests, args.concurrency, kardex)),
+                *await probe.measure(run_phase("login", args.logins, args.auth_concurrency, login)),
+                *await probe.measure(run_phase("refresh", args.logins, args.auth_concurrency, refresh)),
+                *await probe.measure(
+                    run_phase("movements_mixed", args.requests, args.concurrency, movement),
+                    run_phase("balances_mixed", args.requests // 2, args.concurrency // 2 or 1, balances),
+                    run_phase("kardex_mixed", args.requests // 2, args.concurrency // 2 or 1, kardex),
+                ),
+            ]
+    finally:
+        await probe.close()
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    started_at = datetime.now(timezone.utc).isoformat()
+    # Files are read and written outside the event loop.
+    results = asyncio.run(run_suite(args))
+    report = {
+        "commit": git_commit(),
+        "started_at": started_at,
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "database_url")},
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database-url", default=settings.async_database_url, help="database the API uses (lock statistics)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--auth-concurrency", type=int, default=16)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--sample-interval", type=float, default=0.05)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    main(parser.parse_args())